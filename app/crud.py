@@ -1,5 +1,69 @@
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .models import Workflow
+from . import metrics
+from .models import (
+    ApiQuotaUsage,
+    ForumTopicState,
+    Workflow,
+    WorkflowSnapshot,
+    YoutubeQueryYield,
+    YoutubeSeenVideo,
+)
+
+# Rows per INSERT ... ON CONFLICT statement
+BULK_UPSERT_CHUNK_SIZE = 500
+
+WORKFLOW_KEY = ("name", "platform", "country")
+
+SNAPSHOT_FIELDS = (
+    "name", "platform", "country",
+    "views", "likes", "comments",
+    "popularity_score", "engagement_score", "volume_score", "trend_score",
+    "trend_avg_interest",
+)
+
+# Compared against the stored row to tell updated from unchanged upserts
+CHANGE_FIELDS = ("views", "likes", "comments", "popularity_score")
+
+# INSERT constructs that support ON CONFLICT, per dialect
+UPSERT_INSERTS = {
+    "sqlite": sqlite_insert,
+    "postgresql": postgresql_insert,
+}
+
+# Raw snapshots older than this are collapsed to one row per day;
+# snapshots of any resolution older than the retention are deleted
+SNAPSHOT_RAW_DAYS = int(os.getenv("SNAPSHOT_RAW_DAYS", 7))
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", 730))
+
+
+# --------------------------------------------------
+# DATA GENERATION (read-cache invalidation)
+# --------------------------------------------------
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def get_data_generation() -> int:
+    return _generation
+
+
+def bump_data_generation() -> int:
+    """
+    Called after every committed write to `workflows` so cached
+    /workflows responses built from older data are discarded.
+    """
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        return _generation
 
 
 # --------------------------------------------------
@@ -9,6 +73,7 @@ def create_workflow(db: Session, workflow_data: dict):
     workflow = Workflow(**workflow_data)
     db.add(workflow)
     db.commit()
+    bump_data_generation()
     db.refresh(workflow)
     return workflow
 
@@ -16,44 +81,83 @@ def create_workflow(db: Session, workflow_data: dict):
 # --------------------------------------------------
 # READ (API endpoint)
 # --------------------------------------------------
-def get_workflows(
-    db: Session,
-    platform: str | None = None,
-    country: str | None = None,
-    limit: int = 50
-):
-    query = db.query(Workflow)
-
+def _filter_workflows_page(query, platform, country, limit, after):
     if platform:
         query = query.filter(Workflow.platform == platform)
 
     if country:
         query = query.filter(Workflow.country == country)
 
-    workflows = (
+    if after is not None:
+        query = query.filter(
+            tuple_(Workflow.popularity_score, Workflow.id) < tuple_(*after)
+        )
+
+    # One extra row tells whether another page exists
+    return (
         query
-        .order_by(Workflow.popularity_score.desc())
-        .limit(limit)
-        .all()
+        .order_by(Workflow.popularity_score.desc(), Workflow.id.desc())
+        .limit(limit + 1)
+    )
+
+
+# Columns served by /workflows in WorkflowOut field order, with NULLs
+# coalesced in SQL so every row validates as a WorkflowOut
+WORKFLOW_OUT_COLUMNS = {
+    "name": Workflow.name,
+    "platform": Workflow.platform,
+    "country": Workflow.country,
+    "views": func.coalesce(Workflow.views, 0),
+    "likes": func.coalesce(Workflow.likes, 0),
+    "comments": func.coalesce(Workflow.comments, 0),
+    "like_to_view_ratio": func.coalesce(Workflow.like_to_view_ratio, 0.0),
+    "comment_to_view_ratio": func.coalesce(Workflow.comment_to_view_ratio, 0.0),
+    "popularity_score": func.coalesce(Workflow.popularity_score, 0),
+    "engagement_score": func.coalesce(Workflow.engagement_score, 0),
+    "volume_score": func.coalesce(Workflow.volume_score, 0),
+    "trend_score": func.coalesce(Workflow.trend_score, 0),
+    "trend_direction": Workflow.trend_direction,
+    "trend_avg_interest": Workflow.trend_avg_interest,
+    "trend_freshness": Workflow.trend_freshness,
+    "explanation": func.coalesce(Workflow.explanation, ""),
+}
+_POPULARITY_INDEX = list(WORKFLOW_OUT_COLUMNS).index("popularity_score")
+
+
+def _workflow_rows_stmt(platform, country, limit, after):
+    return _filter_workflows_page(
+        select(*WORKFLOW_OUT_COLUMNS.values(), Workflow.id),
+        platform, country, limit, after,
     )
 
-    # 🔥 NORMALIZE NULL VALUES (CRITICAL FOR API STABILITY)
-    for w in workflows:
-        w.views = w.views or 0
-        w.likes = w.likes or 0
-        w.comments = w.comments or 0
 
-        w.like_to_view_ratio = w.like_to_view_ratio or 0.0
-        w.comment_to_view_ratio = w.comment_to_view_ratio or 0.0
+def _split_rows_page(rows, limit):
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = (rows[-1][_POPULARITY_INDEX], rows[-1][-1])
 
-        w.popularity_score = w.popularity_score or 0
-        w.engagement_score = w.engagement_score or 0
-        w.volume_score = w.volume_score or 0
-        w.trend_score = w.trend_score or 0
+    return [tuple(row[:-1]) for row in rows], next_after
 
-        w.explanation = w.explanation or ""
 
-    return workflows
+async def get_workflow_rows_page_async(
+    db: AsyncSession,
+    platform: str | None = None,
+    country: str | None = None,
+    limit: int = 50,
+    after: tuple | None = None,
+):
+    """
+    One page of /workflows rows ordered by (popularity_score DESC, id DESC):
+    plain WORKFLOW_OUT_COLUMNS tuples, no ORM objects.
+
+    `after` is the (popularity_score, id) of the last row of the previous
+    page; the seek predicate lets deep pages use the same index range
+    scan as the first one. Returns (rows, next_after), where next_after
+    is None on the last page.
+    """
+    stmt = _workflow_rows_stmt(platform, country, limit, after)
+    return _split_rows_page((await db.execute(stmt)).all(), limit)
 
 
 # --------------------------------------------------
@@ -74,11 +178,485 @@ def upsert_workflow(db: Session, workflow_data: dict):
         for key, value in workflow_data.items():
             setattr(existing, key, value)
         db.commit()
+        bump_data_generation()
         db.refresh(existing)
         return existing
 
     workflow = Workflow(**workflow_data)
     db.add(workflow)
     db.commit()
+    bump_data_generation()
     db.refresh(workflow)
     return workflow
+
+
+# --------------------------------------------------
+# BULK UPSERT (used by fetchers)
+# --------------------------------------------------
+def _upsert_insert(db: Session, model):
+    dialect = db.get_bind().dialect.name
+    try:
+        return UPSERT_INSERTS[dialect](model)
+    except KeyError:
+        raise RuntimeError(f"Bulk upsert is not supported on {dialect}") from None
+
+
+def bulk_upsert_workflows(
+    db: Session,
+    rows: list[dict],
+    run_ts: datetime | None = None,
+) -> int:
+    """
+    Insert or update a batch of workflows in a single transaction using
+    INSERT ... ON CONFLICT(name, platform, country) DO UPDATE.
+
+    Rows sharing a key are collapsed (last one wins, like repeated
+    upsert_workflow calls). All rows must carry the same set of fields.
+    A `workflow_snapshots` row stamped `run_ts` (default: now) is
+    appended for each workflow in the same transaction.
+    """
+    if not rows:
+        return 0
+
+    unique_rows = list({
+        tuple(row[k] for k in WORKFLOW_KEY): row
+        for row in rows
+    }.values())
+
+    stmt = _upsert_insert(db, Workflow)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(WORKFLOW_KEY),
+        set_={
+            key: stmt.excluded[key]
+            for key in unique_rows[0]
+            if key not in WORKFLOW_KEY
+        },
+    )
+
+    run_ts = run_ts or datetime.utcnow()
+    snapshots = [
+        {
+            "run_ts": run_ts,
+            "resolution": "raw",
+            **{key: row.get(key) for key in SNAPSHOT_FIELDS},
+        }
+        for row in unique_rows
+    ]
+
+    outcomes = {}
+    try:
+        for start in range(0, len(unique_rows), BULK_UPSERT_CHUNK_SIZE):
+            chunk = unique_rows[start:start + BULK_UPSERT_CHUNK_SIZE]
+            _classify_upserts(db, chunk, outcomes)
+            db.execute(stmt, chunk)
+            db.execute(insert(WorkflowSnapshot), snapshots[start:start + BULK_UPSERT_CHUNK_SIZE])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # Only counted once the transaction is in
+    for (platform, country, result), count in outcomes.items():
+        metrics.WORKFLOW_ROWS.inc(count, platform=platform, country=country, result=result)
+
+    bump_data_generation()
+    return len(unique_rows)
+
+
+def _classify_upserts(db: Session, chunk: list[dict], outcomes: dict):
+    """
+    Tally each row as inserted / updated / unchanged against what is
+    stored now, keyed by (platform, country, result).
+    """
+    keys = [tuple(row[k] for k in WORKFLOW_KEY) for row in chunk]
+    existing = {
+        tuple(found[:len(WORKFLOW_KEY)]): tuple(found[len(WORKFLOW_KEY):])
+        for found in db.execute(
+            select(
+                *(getattr(Workflow, k) for k in WORKFLOW_KEY),
+                *(getattr(Workflow, f) for f in CHANGE_FIELDS),
+            ).where(tuple_(*(getattr(Workflow, k) for k in WORKFLOW_KEY)).in_(keys))
+        )
+    }
+
+    for key, row in zip(keys, chunk):
+        stored = existing.get(key)
+        if stored is None:
+            result = "inserted"
+        elif stored != tuple(row.get(f, value) for f, value in zip(CHANGE_FIELDS, stored)):
+            result = "updated"
+        else:
+            result = "unchanged"
+
+        label = (row["platform"], row["country"], result)
+        outcomes[label] = outcomes.get(label, 0) + 1
+
+
+# --------------------------------------------------
+# CHUNKED SCAN + BULK UPDATE (used by rescore)
+# --------------------------------------------------
+def iter_workflow_chunks(db: Session, columns: list, chunk_size: int = BULK_UPSERT_CHUNK_SIZE):
+    """
+    Yield lists of (id, *columns) rows in id order using keyset
+    pagination, so memory stays bounded by `chunk_size`.
+    """
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Workflow.id, *columns)
+            .filter(Workflow.id > last_id)
+            .order_by(Workflow.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def bulk_update_workflows(db: Session, rows: list[dict]) -> int:
+    """
+    UPDATE by primary key for a batch of {"id": ..., field: value} dicts.
+    """
+    if not rows:
+        return 0
+
+    try:
+        db.execute(update(Workflow), rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    bump_data_generation()
+    return len(rows)
+
+
+# --------------------------------------------------
+# FORUM TOPIC STATE (incremental forum ingestion)
+# --------------------------------------------------
+def get_forum_watermark(db: Session, country: str) -> datetime | None:
+    return (
+        db.query(func.max(ForumTopicState.bumped_at))
+        .filter(ForumTopicState.country == country)
+        .scalar()
+    )
+
+
+def get_forum_topic_states(db: Session, country: str, topic_ids: list[int]) -> dict:
+    """
+    {topic_id: (posts_count, like_count, views)} for already-scored topics.
+    """
+    if not topic_ids:
+        return {}
+
+    rows = (
+        db.query(
+            ForumTopicState.topic_id,
+            ForumTopicState.posts_count,
+            ForumTopicState.like_count,
+            ForumTopicState.views,
+        )
+        .filter(
+            ForumTopicState.country == country,
+            ForumTopicState.topic_id.in_(topic_ids),
+        )
+        .all()
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def get_forum_workflow_topics(db: Session, country: str, workflow_names) -> dict:
+    """
+    {workflow_name: {topic_id: (posts_count, like_count, views, contributors)}}
+    for the already-scored topics of each workflow.
+    """
+    workflow_names = list(workflow_names)
+    if not workflow_names:
+        return {}
+
+    rows = (
+        db.query(
+            ForumTopicState.workflow_name,
+            ForumTopicState.topic_id,
+            ForumTopicState.posts_count,
+            ForumTopicState.like_count,
+            ForumTopicState.views,
+            ForumTopicState.contributors,
+        )
+        .filter(
+            ForumTopicState.country == country,
+            ForumTopicState.workflow_name.in_(workflow_names),
+        )
+        .all()
+    )
+
+    topics: dict = {}
+    for row in rows:
+        topics.setdefault(row[0], {})[row[1]] = tuple(row[2:])
+    return topics
+
+
+def upsert_forum_topic_states(db: Session, rows: list[dict]) -> int:
+    if not rows:
+        return 0
+
+    stmt = _upsert_insert(db, ForumTopicState)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["topic_id", "country"],
+        set_={
+            key: stmt.excluded[key]
+            for key in (
+                "bumped_at", "posts_count", "like_count", "views", "contributors", "workflow_name"
+            )
+        },
+    )
+
+    try:
+        for start in range(0, len(rows), BULK_UPSERT_CHUNK_SIZE):
+            db.execute(stmt, rows[start:start + BULK_UPSERT_CHUNK_SIZE])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return len(rows)
+
+
+# --------------------------------------------------
+# API QUOTA / YOUTUBE SEARCH YIELD
+# --------------------------------------------------
+def get_api_quota_usage(db: Session, api: str, day: date) -> int:
+    units = (
+        db.query(ApiQuotaUsage.units)
+        .filter(ApiQuotaUsage.api == api, ApiQuotaUsage.day == day)
+        .scalar()
+    )
+    return units or 0
+
+
+def add_api_quota_usage(db: Session, api: str, day: date, units: int):
+    stmt = _upsert_insert(db, ApiQuotaUsage).values(
+        api=api, day=day, units=units, updated_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["api", "day"],
+        set_={
+            "units": ApiQuotaUsage.units + stmt.excluded.units,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+    try:
+        db.execute(stmt)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def get_youtube_query_yields(db: Session) -> dict:
+    """
+    {(query, country): (pages, new_video_ids)} from the last run.
+    """
+    rows = db.query(
+        YoutubeQueryYield.query,
+        YoutubeQueryYield.country,
+        YoutubeQueryYield.pages,
+        YoutubeQueryYield.new_video_ids,
+    ).all()
+    return {(row[0], row[1]): (row[2], row[3]) for row in rows}
+
+
+def upsert_youtube_query_yields(db: Session, rows: list[dict]) -> int:
+    if not rows:
+        return 0
+
+    stmt = _upsert_insert(db, YoutubeQueryYield)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["query", "country"],
+        set_={
+            key: stmt.excluded[key]
+            for key in ("pages", "video_ids", "new_video_ids", "run_ts")
+        },
+    )
+
+    try:
+        db.execute(stmt, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return len(rows)
+
+
+def mark_youtube_videos_seen(
+    db: Session,
+    video_ids: list[str],
+    seen_at: datetime,
+    retention_days: int,
+) -> set:
+    """
+    Record `video_ids` as seen at `seen_at` and return the ones not seen
+    in the last `retention_days` (older entries are dropped first).
+    """
+    cutoff = seen_at - timedelta(days=retention_days)
+    video_ids = list(dict.fromkeys(video_ids))
+
+    try:
+        db.query(YoutubeSeenVideo).filter(
+            YoutubeSeenVideo.last_seen_at < cutoff
+        ).delete(synchronize_session=False)
+
+        new_ids = set()
+        stmt = _upsert_insert(db, YoutubeSeenVideo)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["video_id"],
+            set_={"last_seen_at": stmt.excluded.last_seen_at},
+        )
+
+        for start in range(0, len(video_ids), BULK_UPSERT_CHUNK_SIZE):
+            chunk = video_ids[start:start + BULK_UPSERT_CHUNK_SIZE]
+            known = {
+                row[0]
+                for row in db.query(YoutubeSeenVideo.video_id)
+                .filter(YoutubeSeenVideo.video_id.in_(chunk))
+            }
+            new_ids.update(video_id for video_id in chunk if video_id not in known)
+
+            db.execute(stmt, [
+                {"video_id": video_id, "first_seen_at": seen_at, "last_seen_at": seen_at}
+                for video_id in chunk
+            ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return new_ids
+
+
+# --------------------------------------------------
+# WORKFLOW SNAPSHOTS (history)
+# --------------------------------------------------
+def _workflow_history_stmt(name, platform, country, start, end, limit, before):
+    S = WorkflowSnapshot
+    stmt = select(S).where(S.name == name)
+
+    if platform:
+        stmt = stmt.where(S.platform == platform)
+
+    if country:
+        stmt = stmt.where(S.country == country)
+
+    if start:
+        stmt = stmt.where(S.run_ts >= start)
+
+    if end:
+        stmt = stmt.where(S.run_ts < end)
+
+    if before is not None:
+        stmt = stmt.where(tuple_(S.run_ts, S.id) < tuple_(*before))
+
+    # Newest first; one extra row tells whether older points exist
+    return stmt.order_by(S.run_ts.desc(), S.id.desc()).limit(limit + 1)
+
+
+async def get_workflow_history_async(
+    db: AsyncSession,
+    name: str,
+    platform: str | None = None,
+    country: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = 1000,
+    before: tuple | None = None,
+):
+    """
+    The newest `limit` snapshots in [start, end), returned oldest first.
+
+    `before` is the (run_ts, id) of the oldest snapshot of the previous
+    call. Returns (snapshots, next_before), where next_before is None
+    once no older snapshots are left.
+    """
+    stmt = _workflow_history_stmt(name, platform, country, start, end, limit, before)
+    snapshots = (await db.scalars(stmt)).all()
+
+    next_before = None
+    if len(snapshots) > limit:
+        snapshots = snapshots[:limit]
+        next_before = (snapshots[-1].run_ts, snapshots[-1].id)
+
+    return snapshots[::-1], next_before
+
+
+def compact_snapshots(db: Session, now: datetime | None = None) -> dict:
+    """
+    Retention + downsampling for workflow_snapshots:
+    - raw rows older than SNAPSHOT_RAW_DAYS become one "daily" row per
+      (name, platform, country, day): peak counts, averaged scores
+    - rows older than SNAPSHOT_RETENTION_DAYS are deleted
+    """
+    now = now or datetime.utcnow()
+    raw_cutoff = now - timedelta(days=SNAPSHOT_RAW_DAYS)
+    retention_cutoff = now - timedelta(days=SNAPSHOT_RETENTION_DAYS)
+
+    # Whole days only, so a day is never split between raw and daily rows
+    raw_cutoff = raw_cutoff.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if db.get_bind().dialect.name == "sqlite":
+        # Same text format SQLAlchemy binds datetimes in, so stored days
+        # compare correctly against range boundaries
+        day = func.strftime("%Y-%m-%d 00:00:00.000000", WorkflowSnapshot.run_ts)
+    else:
+        day = func.date_trunc("day", WorkflowSnapshot.run_ts)
+
+    S = WorkflowSnapshot
+    old_raw = (S.resolution == "raw", S.run_ts < raw_cutoff)
+
+    daily = (
+        db.query(
+            S.name, S.platform, S.country, day.label("run_ts"),
+            literal("daily").label("resolution"),
+            func.max(S.views), func.max(S.likes), func.max(S.comments),
+            func.round(func.avg(S.popularity_score)),
+            func.round(func.avg(S.engagement_score)),
+            func.round(func.avg(S.volume_score)),
+            func.round(func.avg(S.trend_score)),
+            func.avg(S.trend_avg_interest),
+        )
+        .filter(*old_raw)
+        .group_by(S.name, S.platform, S.country, day)
+    )
+
+    try:
+        downsampled = db.execute(
+            insert(S).from_select(
+                [
+                    "name", "platform", "country", "run_ts", "resolution",
+                    "views", "likes", "comments",
+                    "popularity_score", "engagement_score", "volume_score", "trend_score",
+                    "trend_avg_interest",
+                ],
+                daily,
+            )
+        ).rowcount
+
+        replaced = (
+            db.query(S).filter(*old_raw).delete(synchronize_session=False)
+        )
+
+        expired = (
+            db.query(S)
+            .filter(S.run_ts < retention_cutoff)
+            .delete(synchronize_session=False)
+        )
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {"downsampled": downsampled, "replaced": replaced, "expired": expired}
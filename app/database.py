@@ -1,16 +1,131 @@
 import os
-from sqlalchemy import create_engine
+from functools import lru_cache
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "workflows.db")
 
-DATABASE_URL = f"sqlite:///{DB_PATH}"
+# Defaults to the local SQLite file; e.g. postgresql+psycopg2://user:pw@host/db
+# for a shared store behind several API replicas (drivers: requirements-postgres.txt)
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
+# API reads may go to a replica; defaults to the primary
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", DATABASE_URL)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+# asyncio driver used for each backend by the async API engine
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+# -------------------------------------------------
+# SERVER DATABASE POOL
+# -------------------------------------------------
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# Seconds before a pooled connection is replaced (server-side idle timeouts)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1").lower() not in ("0", "false", "no")
+
+# -------------------------------------------------
+# SQLITE CONNECTION PROFILE
+# -------------------------------------------------
+
+# WAL lets API readers keep reading while ingestion commits;
+# synchronous=NORMAL is durable across app crashes in WAL mode
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+# Negative values are KiB, positive values are pages
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64_000))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5_000))
+
+
+def _apply_pragmas(dbapi_connection, read_only: bool):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        if not read_only:
+            # journal_mode is persistent in the file, set it from the writer
+            cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+    finally:
+        cursor.close()
+
+
+def _apply_server_session(dbapi_connection, read_only: bool):
+    if not read_only:
+        return
+
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+    finally:
+        cursor.close()
+    # Session settings made inside a rolled-back transaction are undone
+    dbapi_connection.commit()
+
+
+def _engine_options(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
+
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _configure_connections(engine, url: str, read_only: bool):
+    apply = (
+        _apply_pragmas
+        if make_url(url).get_backend_name() == "sqlite"
+        else _apply_server_session
+    )
+
+    @event.listens_for(engine, "connect")
+    def configure_connection(dbapi_connection, connection_record):
+        apply(dbapi_connection, read_only)
+
+
+def _create_engine(url: str, read_only: bool):
+    engine = create_engine(url, **_engine_options(url))
+    _configure_connections(engine, url, read_only)
+    return engine
+
+
+def _create_async_engine(url: str, read_only: bool):
+    engine = create_async_engine(url, **_engine_options(url))
+    # Connect events fire on the sync engine the async one wraps
+    _configure_connections(engine.sync_engine, url, read_only)
+    return engine
+
+
+def async_url(url: str) -> str:
+    """
+    Same database through its asyncio driver (aiosqlite / asyncpg).
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(
+        hide_password=False
+    )
+
+
+# -------------------------------------------------
+# ENGINES / SESSIONS
+# -------------------------------------------------
+
+# Write engine: ingestion, rescoring, migrations
+engine = _create_engine(DATABASE_URL, read_only=False)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -18,4 +133,26 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+@lru_cache(maxsize=None)
+def _async_read_sessionmaker() -> async_sessionmaker:
+    # Async read-only engine: API request handlers. Built on first use so
+    # ingestion / cron imports do not need the asyncio driver (asyncpg)
+    async_read_engine = _create_async_engine(
+        os.getenv("ASYNC_DATABASE_READ_URL") or async_url(DATABASE_READ_URL),
+        read_only=True,
+    )
+    return async_sessionmaker(
+        autoflush=False,
+        expire_on_commit=False,
+        bind=async_read_engine
+    )
+
+
+def async_read_session() -> AsyncSession:
+    """
+    New async read-only session for an API request handler.
+    """
+    return _async_read_sessionmaker()()
+
+
 Base = declarative_base()
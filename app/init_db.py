@@ -1,10 +1,8 @@
-from app.database import engine
-from app.models import Workflow  # <-- THIS IS REQUIRED
-from app.database import Base
+from app.migrations import migrate
 
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    migrate()
     print("Database tables created successfully.")
 
 
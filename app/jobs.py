@@ -0,0 +1,169 @@
+"""
+Background ingestion jobs
+POST /ingest and POST /rescore enqueue a job; GET /ingest/{job_id} and
+GET /rescore/{job_id} report on it. A single worker thread plus a
+single-flight check means at most one job (of either kind) runs in this
+process at a time; ingestion_lock() extends that across processes
+(cron, manual fetcher and rescore runs, API workers).
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from app.database import BASE_DIR
+
+# Finished jobs kept for status lookups
+MAX_JOB_HISTORY = 50
+
+INGEST_LOCK_PATH = os.getenv("INGEST_LOCK_PATH", os.path.join(BASE_DIR, "ingestion.lock"))
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+_jobs: OrderedDict = OrderedDict()
+_active_job_id: str | None = None
+_lock = threading.Lock()
+
+
+def _snapshot(job: dict) -> dict:
+    return {
+        **job,
+        "sources": {name: dict(state) for name, state in job["sources"].items()},
+    }
+
+
+def _run_job(job_id: str, target):
+    global _active_job_id
+
+    job = _jobs[job_id]
+
+    def progress(source, **fields):
+        with _lock:
+            job["sources"].setdefault(source, {}).update(fields)
+
+    with _lock:
+        job["status"] = "running"
+        job["started_at"] = datetime.utcnow().isoformat()
+    start = time.perf_counter()
+
+    try:
+        target(progress=progress)
+        status, error = "succeeded", None
+    except Exception as e:
+        status, error = "failed", str(e)
+
+    with _lock:
+        job["status"] = status
+        job["error"] = error
+        job["finished_at"] = datetime.utcnow().isoformat()
+        job["duration_seconds"] = round(time.perf_counter() - start, 3)
+        job["items"] = sum(
+            state.get("items") or 0 for state in job["sources"].values()
+        )
+        _active_job_id = None
+
+
+def submit_job(target, kind: str = "ingest") -> tuple:
+    """
+    Enqueue `target(progress=...)` unless a job is already queued or
+    running. Returns (job, created); when not created, `job` is the
+    active one, whose "kind" may differ.
+    """
+    global _active_job_id
+
+    with _lock:
+        if _active_job_id is not None:
+            return _snapshot(_jobs[_active_job_id]), False
+
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = {
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "duration_seconds": None,
+            "items": None,
+            "error": None,
+            "sources": {},
+        }
+        _active_job_id = job_id
+
+        while len(_jobs) > MAX_JOB_HISTORY:
+            oldest = next(iter(_jobs))
+            if oldest == job_id:
+                break
+            del _jobs[oldest]
+
+        job = _snapshot(_jobs[job_id])
+
+    _executor.submit(_run_job, job_id, target)
+    return job, True
+
+
+def get_job(job_id: str) -> dict | None:
+    with _lock:
+        job = _jobs.get(job_id)
+        return _snapshot(job) if job is not None else None
+
+# -------------------------------------------------
+# CROSS-PROCESS LOCK
+# -------------------------------------------------
+
+class IngestionLocked(RuntimeError):
+    pass
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def ingestion_lock():
+    """
+    Exclusive OS lock on INGEST_LOCK_PATH, held by every entry point
+    that writes workflows (ingestion and rescoring). The OS drops it when its holder exits, crashed or not, so
+    there is no stale lock to take over; the file itself stays in place.
+    Raises IngestionLocked when another run holds it.
+    """
+    f = open(INGEST_LOCK_PATH, "a+")
+    try:
+        try:
+            _lock_file(f)
+        except OSError:
+            raise IngestionLocked("Another ingestion run is in progress")
+
+        try:
+            # Holder's PID, for whoever finds the lock taken
+            f.seek(0)
+            f.truncate()
+            f.write(str(os.getpid()))
+            f.flush()
+            yield
+        finally:
+            _unlock_file(f)
+    finally:
+        f.close()
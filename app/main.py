@@ -1,55 +1,308 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 
-from app.database import engine, SessionLocal, Base
-from app.crud import get_workflows
-from app.schemas import WorkflowOut
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from pydantic_core import to_json
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from scripts.run_ingestion import run_all_ingestions
+from app import metrics
+from app.database import async_read_session
+from app.crud import (
+    WORKFLOW_OUT_COLUMNS,
+    get_data_generation,
+    get_workflow_history_async,
+    get_workflow_rows_page_async,
+)
+from app.schemas import WorkflowOut, WorkflowSnapshotOut
+from app.jobs import submit_job, get_job
 
 app = FastAPI(title="n8n Workflow Popularity API")
 
-Base.metadata.create_all(bind=engine)
+# Larger `limit` values are clamped to this
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 500))
+MAX_HISTORY_POINTS = int(os.getenv("MAX_HISTORY_POINTS", 5000))
 
+# /workflows read cache. Entries are dropped when the data generation
+# changes (writes in this process) or after the TTL (writes from the
+# cron process, which this process cannot see).
+LEADERBOARD_CACHE_SIZE = int(os.getenv("LEADERBOARD_CACHE_SIZE", 256))
+LEADERBOARD_CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL", 60))
+LEADERBOARD_MAX_AGE = int(os.getenv("LEADERBOARD_MAX_AGE", 0))
 
-def get_db():
-    db = SessionLocal()
-    try:
+# Signed 64-bit range of cursor values
+CURSOR_MIN, CURSOR_MAX = -2**63, 2**63 - 1
+
+WORKFLOW_OUT_FIELDS = tuple(WORKFLOW_OUT_COLUMNS)
+_leaderboard_cache: OrderedDict = OrderedDict()
+_leaderboard_lock = threading.Lock()
+
+# API workers never run DDL: the schema is applied by `python -m
+# app.init_db` and by every ingestion / rescore run
+
+
+async def get_db():
+    # API handlers only read; writes go through the ingestion jobs
+    async with async_read_session() as db:
         yield db
-    finally:
-        db.close()
+
+
+def encode_cursor(after: tuple) -> str:
+    raw = json.dumps(list(after), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, workflow_id = json.loads(raw)
+        after = int(score), int(workflow_id)
+    except (ValueError, TypeError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Both are bound as 64-bit integers
+    if not all(CURSOR_MIN <= value <= CURSOR_MAX for value in after):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after
+
+
+def encode_history_cursor(before: tuple) -> str:
+    run_ts, snapshot_id = before
+    return encode_cursor((run_ts.isoformat(), snapshot_id))
+
+
+def decode_history_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        run_ts, snapshot_id = json.loads(raw)
+        before = datetime.fromisoformat(run_ts), int(snapshot_id)
+    except (ValueError, TypeError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not CURSOR_MIN <= before[1] <= CURSOR_MAX:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return before
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Ingestion and API metrics in the Prometheus text format.
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def _filter_shape(**params) -> str:
+    # Which filters were given, not their values: keeps label cardinality fixed
+    return "+".join(name for name, value in params.items() if value is not None) or "none"
+
+
+# --------------------------------------------------
+# /workflows READ CACHE
+# --------------------------------------------------
+def _render_workflows(rows) -> bytes:
+    """
+    Serialize WORKFLOW_OUT_COLUMNS rows straight to JSON bytes.
+    Uses the same pydantic-core encoder as response_model=list[WorkflowOut],
+    without per-row model validation, so the output is byte-identical.
+    """
+    return to_json([dict(zip(WORKFLOW_OUT_FIELDS, row)) for row in rows])
+
+
+async def _cached_leaderboard(key: tuple):
+    generation = get_data_generation()
+    now = time.monotonic()
+
+    with _leaderboard_lock:
+        entry = _leaderboard_cache.get(key)
+        if entry is not None:
+            if entry["generation"] == generation and now - entry["built_at"] < LEADERBOARD_CACHE_TTL:
+                _leaderboard_cache.move_to_end(key)
+                return entry
+            del _leaderboard_cache[key]
+
+    platform, country, limit, after = key
+    async with async_read_session() as db:
+        rows, next_after = await get_workflow_rows_page_async(
+            db,
+            platform=platform,
+            country=country,
+            limit=limit,
+            after=after,
+        )
+    body = _render_workflows(rows)
+
+    entry = {
+        "generation": generation,
+        "built_at": now,
+        "body": body,
+        "etag": '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"',
+        "next_cursor": encode_cursor(next_after) if next_after is not None else None,
+    }
+
+    with _leaderboard_lock:
+        _leaderboard_cache[key] = entry
+        while len(_leaderboard_cache) > LEADERBOARD_CACHE_SIZE:
+            _leaderboard_cache.popitem(last=False)
+
+    return entry
+
+
 @app.get("/workflows", response_model=list[WorkflowOut])
-def list_workflows(
+async def list_workflows(
+    request: Request,
     platform: str | None = None,
     country: str | None = None,
-    limit: int = 50,
-    db: Session = Depends(get_db),
+    limit: int = Query(50, ge=1),
+    cursor: str | None = None,
 ):
-    return get_workflows(db, platform=platform, country=country, limit=limit)
+    """
+    Workflows ranked by popularity.
+    When more rows exist, the `X-Next-Cursor` response header holds the
+    cursor for the next page; pass it back as `cursor`.
+    Supports If-None-Match revalidation against the returned ETag.
+    """
+    key = (
+        platform,
+        country,
+        min(limit, MAX_PAGE_SIZE),
+        decode_cursor(cursor) if cursor else None,
+    )
+    with metrics.API_REQUEST_SECONDS.time(
+        endpoint="/workflows",
+        filter=_filter_shape(platform=platform, country=country, cursor=cursor),
+    ):
+        entry = await _cached_leaderboard(key)
 
+    headers = {
+        "ETag": entry["etag"],
+        "Cache-Control": f"public, max-age={LEADERBOARD_MAX_AGE}",
+    }
+    if entry["next_cursor"] is not None:
+        headers["X-Next-Cursor"] = entry["next_cursor"]
 
-@app.post("/ingest")
-def ingest_workflows():
+    if_none_match = request.headers.get("if-none-match", "")
+    if entry["etag"] in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+
+@app.get("/workflows/{name}/history", response_model=list[WorkflowSnapshotOut])
+async def workflow_history(
+    response: Response,
+    name: str,
+    platform: str | None = None,
+    country: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = Query(1000, ge=1),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
     """
-    Triggers YouTube + Forum ingestion.
-    Safe to call manually or via cron.
+    The newest `limit` snapshots of one workflow in [start, end), in time
+    order. Older history is served at daily resolution.
+    When older snapshots exist, the `X-Next-Cursor` response header holds
+    the cursor for them; pass it back as `cursor`.
     """
-    try:
-        run_all_ingestions()
-        return {
-            "status": "success",
-            "message": "Ingestion triggered successfully"
-        }
-    except Exception as e:
-        # 👇 VERY IMPORTANT
-        return {
-            "status": "failed",
-            "error": str(e)
-        }
+    before = decode_history_cursor(cursor) if cursor else None
+
+    with metrics.API_REQUEST_SECONDS.time(
+        endpoint="/workflows/{name}/history",
+        filter=_filter_shape(
+            platform=platform, country=country, start=start, end=end, cursor=cursor
+        ),
+    ):
+        snapshots, next_before = await get_workflow_history_async(
+            db,
+            name,
+            platform=platform,
+            country=country,
+            start=start,
+            end=end,
+            limit=min(limit, MAX_HISTORY_POINTS),
+            before=before,
+        )
+
+    if next_before is not None:
+        response.headers["X-Next-Cursor"] = encode_history_cursor(next_before)
+    return snapshots
+
+
+@app.post("/ingest", status_code=202)
+async def ingest_workflows():
+    """
+    Queues YouTube + Forum ingestion and returns immediately.
+    Only one ingestion runs at a time; while one is queued or running,
+    its job is returned instead of starting another; 409 while a
+    rescore job is. Safe to call manually or via cron.
+    """
+    # Ingestion dependencies (fetchers, pytrends, credentials) load on
+    # first use, not when API workers boot
+    from scripts.run_ingestion import run_all_ingestions
+
+    job, created = submit_job(run_all_ingestions)
+    if job["kind"] != "ingest":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Rescore job {job['id']} is {job['status']}",
+        )
+    return {
+        "status": "accepted" if created else "already_running",
+        "job_id": job["id"],
+    }
+
+
+@app.get("/ingest/{job_id}")
+async def ingest_status(job_id: str):
+    """
+    Job status, duration, item counts and per-source progress/errors.
+    """
+    job = get_job(job_id)
+    if job is None or job["kind"] != "ingest":
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+@app.post("/rescore", status_code=202)
+async def rescore():
+    """
+    Queues a recompute of every stored workflow's scores from its raw
+    counts (no external API calls) and returns immediately.
+    While another rescore is queued or running its job is returned;
+    409 while an ingestion job is.
+    """
+    from scripts.rescore import rescore_workflows
+
+    job, created = submit_job(rescore_workflows, kind="rescore")
+    if job["kind"] != "rescore":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Ingestion job {job['id']} is {job['status']}",
+        )
+    return {
+        "status": "accepted" if created else "already_running",
+        "job_id": job["id"],
+    }
+
+
+@app.get("/rescore/{job_id}")
+async def rescore_status(job_id: str):
+    """
+    Job status, duration and rows rescored; `error` when it failed.
+    """
+    job = get_job(job_id)
+    if job is None or job["kind"] != "rescore":
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
@@ -0,0 +1,202 @@
+"""
+In-process metrics
+Counters and histograms for ingestion and the API, rendered in the
+Prometheus text format by GET /metrics.
+
+Recording is a dict update under a lock; nothing is formatted until a
+scrape calls render(). Ingestion run by cron in another process is
+not visible here, only runs started through /ingest.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; covers single HTTP calls up to whole ingestion stages
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else f"{int(value)}"
+
+# -------------------------------------------------
+# METRIC TYPES
+# -------------------------------------------------
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: dict = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self._values.items()
+            )
+
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+# -------------------------------------------------
+# METRICS
+# -------------------------------------------------
+
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_seconds",
+    "Time spent per ingestion stage (search, video_stats, fetch, trends, scoring, db_write).",
+    ("source", "country", "stage"),
+)
+
+INGEST_SOURCE_RUNS = Counter(
+    "ingest_source_runs_total",
+    "Ingestion source steps by outcome.",
+    ("source", "status"),
+)
+
+WORKFLOW_ROWS = Counter(
+    "workflow_rows_total",
+    "Workflow rows written by bulk upserts, by outcome (inserted, updated, unchanged).",
+    ("platform", "country", "result"),
+)
+
+TRENDS_FALLBACKS = Counter(
+    "trends_fallback_total",
+    "Keywords not scored from fresh Trends data (stale, fetch_failed, no_data).",
+    ("country", "reason"),
+)
+
+TRENDS_PAYLOADS = Counter(
+    "trends_payloads_total",
+    "Trends payloads by outcome (ok, failed, throttled, skipped by the open breaker).",
+    ("status",),
+)
+
+TRENDS_BREAKER_OPENS = Counter(
+    "trends_breaker_opens_total",
+    "Times the Trends circuit breaker opened.",
+)
+
+HTTP_RESPONSES = Counter(
+    "http_client_responses_total",
+    "Outbound HTTP attempts by host and status (error = connection failure / timeout).",
+    ("host", "status"),
+)
+
+HTTP_RETRIES = Counter(
+    "http_client_retries_total",
+    "Outbound HTTP attempts that were retried.",
+    ("host",),
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_client_request_seconds",
+    "Outbound HTTP attempt latency.",
+    ("host",),
+)
+
+YOUTUBE_QUOTA_UNITS = Counter(
+    "youtube_quota_units_total",
+    "YouTube Data API quota units charged, by endpoint (search, videos).",
+    ("endpoint",),
+)
+
+API_REQUEST_SECONDS = Histogram(
+    "api_request_seconds",
+    "API handler latency by endpoint and filter shape.",
+    ("endpoint", "filter"),
+)
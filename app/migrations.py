@@ -0,0 +1,137 @@
+"""
+Schema migrations for existing databases
+create_all() only creates missing tables, so anything added to an
+existing table (indexes, columns) is applied here. Every step is
+idempotent and safe to run on each startup.
+"""
+
+from sqlalchemy import inspect, text
+
+from app.database import engine, Base
+from app import models  # noqa: F401  (registers tables on Base)
+
+
+def _index_names(conn, table: str) -> set:
+    return {ix["name"] for ix in inspect(conn).get_indexes(table)}
+
+
+def _column_names(conn, table: str) -> set:
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+# -------------------------------------------------
+# MIGRATIONS
+# -------------------------------------------------
+
+def add_workflow_unique_index(conn):
+    """
+    Unique (name, platform, country) index used by ON CONFLICT upserts.
+    Duplicate rows are collapsed to the newest one before it is created.
+    """
+    if "uq_workflows_name_platform_country" in _index_names(conn, "workflows"):
+        return
+
+    conn.execute(text("""
+        DELETE FROM workflows
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM workflows
+            GROUP BY name, platform, country
+        )
+    """))
+    conn.execute(text("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_workflows_name_platform_country
+        ON workflows (name, platform, country)
+    """))
+
+
+def add_forum_topic_state_workflow(conn):
+    """
+    Workflow name and contributors per scored topic (runs before
+    create_missing_indexes, which indexes workflow_name). Topics scored
+    before they existed are forgotten, so the next run rescores them.
+    """
+    columns = _column_names(conn, "forum_topic_state")
+    if "workflow_name" in columns:
+        return
+
+    if "contributors" not in columns:
+        conn.execute(text("ALTER TABLE forum_topic_state ADD COLUMN contributors INTEGER"))
+    conn.execute(text("ALTER TABLE forum_topic_state ADD COLUMN workflow_name VARCHAR"))
+    conn.execute(text("DELETE FROM forum_topic_state"))
+
+
+def create_missing_indexes(conn):
+    """
+    Indexes declared on models but missing from existing tables.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def backfill_null_popularity(conn):
+    """
+    Keyset pagination seeks on (popularity_score, id); NULL scores
+    (already served as 0) would never match the seek predicate.
+    """
+    conn.execute(text(
+        "UPDATE workflows SET popularity_score = 0 WHERE popularity_score IS NULL"
+    ))
+
+
+def add_workflow_trend_freshness(conn):
+    """
+    Nullable column; rows written before it existed stay NULL (unknown).
+    """
+    if "trend_freshness" in _column_names(conn, "workflows"):
+        return
+
+    conn.execute(text("ALTER TABLE workflows ADD COLUMN trend_freshness VARCHAR"))
+
+
+def backfill_default_trend_freshness(conn):
+    """
+    Rows written before trend_freshness existed: real Trends data never
+    scores "stable" at 5, only the DEFAULT_TREND fallback does.
+    """
+    conn.execute(text(
+        "UPDATE workflows SET trend_freshness = 'default' "
+        "WHERE trend_freshness IS NULL AND trend_direction = 'stable' AND trend_score = 5"
+    ))
+
+
+def normalize_sqlite_daily_snapshots(conn):
+    """
+    Daily snapshot days used to be stored as 'YYYY-MM-DD 00:00:00' on
+    SQLite, which sorts before the '... 00:00:00.000000' bound parameters.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+
+    conn.execute(text(
+        "UPDATE workflow_snapshots "
+        "SET run_ts = strftime('%Y-%m-%d 00:00:00.000000', run_ts) "
+        "WHERE resolution = 'daily' AND length(run_ts) = 19"
+    ))
+
+
+MIGRATIONS = [
+    add_workflow_unique_index,
+    add_forum_topic_state_workflow,
+    create_missing_indexes,
+    backfill_null_popularity,
+    add_workflow_trend_freshness,
+    backfill_default_trend_freshness,
+    normalize_sqlite_daily_snapshots,
+]
+
+
+def migrate(bind=engine):
+    """
+    Bring a new or existing database up to the current schema.
+    """
+    Base.metadata.create_all(bind=bind)
+
+    with bind.begin() as conn:
+        for migration in MIGRATIONS:
+            migration(conn)
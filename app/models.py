@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Index
 from datetime import datetime
 
 from app.database import Base
@@ -6,6 +6,21 @@ from app.database import Base
 
 class Workflow(Base):
     __tablename__ = "workflows"
+    __table_args__ = (
+        # Conflict target for bulk_upsert_workflows
+        Index(
+            "uq_workflows_name_platform_country",
+            "name", "platform", "country",
+            unique=True,
+        ),
+        # One index per /workflows filter shape, ending in popularity_score.
+        # SQLite walks them backwards for ORDER BY popularity_score DESC, id DESC
+        # (the rowid is the implicit last column), so no temp B-tree sort.
+        Index("ix_workflows_platform_country_popularity", "platform", "country", "popularity_score"),
+        Index("ix_workflows_platform_popularity", "platform", "popularity_score"),
+        Index("ix_workflows_country_popularity", "country", "popularity_score"),
+        Index("ix_workflows_popularity", "popularity_score"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -23,13 +38,122 @@ class Workflow(Base):
     like_to_view_ratio = Column(Float, default=0.0)
     comment_to_view_ratio = Column(Float, default=0.0)
 
-    popularity_score = Column(Integer)
+    popularity_score = Column(Integer, default=0)  # keyset pagination key
     engagement_score = Column(Integer)
     volume_score = Column(Integer)
     trend_score = Column(Integer)
     trend_direction = Column(String, nullable=True)
     trend_avg_interest = Column(Float, nullable=True)
+    # fresh | stale (last known value, Trends failing) | default (no data)
+    trend_freshness = Column(String, nullable=True)
 
 
     explanation = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class TrendCacheEntry(Base):
+    __tablename__ = "trends_cache"
+
+    keyword = Column(String, primary_key=True)
+    geo = Column(String, primary_key=True)
+    timeframe = Column(String, primary_key=True)
+
+    payload = Column(String, nullable=False)
+    fetched_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class ForumTopicState(Base):
+    """
+    Last-scored counts per forum topic and country.
+    MAX(bumped_at) per country is the incremental ingestion watermark;
+    a workflow's forum row aggregates all topics with its workflow_name.
+    """
+    __tablename__ = "forum_topic_state"
+    __table_args__ = (
+        Index("ix_forum_topic_state_country_bumped_at", "country", "bumped_at"),
+        Index("ix_forum_topic_state_country_workflow_name", "country", "workflow_name"),
+    )
+
+    topic_id = Column(Integer, primary_key=True)
+    country = Column(String, primary_key=True)
+
+    bumped_at = Column(DateTime, nullable=True)
+    posts_count = Column(Integer, default=0)
+    like_count = Column(Integer, default=0)
+    views = Column(Integer, default=0)
+    contributors = Column(Integer, default=0)
+
+    workflow_name = Column(String, nullable=True)
+
+
+class WorkflowSnapshot(Base):
+    """
+    Append-only history of workflow counts and scores, one row per
+    ingestion run ("raw"), downsampled to one row per day ("daily").
+    """
+    __tablename__ = "workflow_snapshots"
+    __table_args__ = (
+        # /workflows/{name}/history range scans
+        Index("ix_workflow_snapshots_key_run_ts", "name", "platform", "country", "run_ts"),
+        # Retention / downsampling sweeps
+        Index("ix_workflow_snapshots_resolution_run_ts", "resolution", "run_ts"),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    name = Column(String, nullable=False)
+    platform = Column(String, nullable=False)
+    country = Column(String, nullable=False)
+    run_ts = Column(DateTime, nullable=False)
+    resolution = Column(String, nullable=False, default="raw")
+
+    views = Column(Integer, default=0)
+    likes = Column(Integer, default=0)
+    comments = Column(Integer, default=0)
+
+    popularity_score = Column(Integer)
+    engagement_score = Column(Integer)
+    volume_score = Column(Integer)
+    trend_score = Column(Integer)
+    trend_avg_interest = Column(Float, nullable=True)
+
+
+class ApiQuotaUsage(Base):
+    """
+    Units spent per API and quota day (YouTube: Pacific time).
+    """
+    __tablename__ = "api_quota_usage"
+
+    api = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    units = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class YoutubeQueryYield(Base):
+    """
+    What each (query, country) search returned on its last run; the
+    quota budget goes to the queries finding the most new videos.
+    """
+    __tablename__ = "youtube_query_yield"
+
+    query = Column(String, primary_key=True)
+    country = Column(String, primary_key=True)
+
+    pages = Column(Integer, default=0)
+    video_ids = Column(Integer, default=0)
+    new_video_ids = Column(Integer, default=0)
+    run_ts = Column(DateTime, nullable=False)
+
+
+class YoutubeSeenVideo(Base):
+    """
+    Video IDs returned by any search within the retention window.
+    """
+    __tablename__ = "youtube_seen_videos"
+
+    video_id = Column(String, primary_key=True)
+    first_seen_at = Column(DateTime, nullable=False)
+    last_seen_at = Column(DateTime, nullable=False, index=True)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, field_validator
 from typing import Optional
+from datetime import datetime
 
 
 class WorkflowOut(BaseModel):
@@ -20,6 +21,7 @@ class WorkflowOut(BaseModel):
     trend_score: int
     trend_direction:Optional[str]
     trend_avg_interest:Optional[float]
+    trend_freshness: Optional[str] = None
 
     explanation: str
 
@@ -45,3 +47,23 @@ class WorkflowOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class WorkflowSnapshotOut(BaseModel):
+    platform: str
+    country: str
+    run_ts: datetime
+    resolution: str
+
+    views: Optional[int] = 0
+    likes: Optional[int] = 0
+    comments: Optional[int] = 0
+
+    popularity_score: Optional[int] = None
+    engagement_score: Optional[int] = None
+    volume_score: Optional[int] = None
+    trend_score: Optional[int] = None
+    trend_avg_interest: Optional[float] = None
+
+    class Config:
+        from_attributes = True
@@ -1,4 +1,6 @@
-from fetcher.google_trends import get_trend_score
+from statistics import median
+
+import numpy as np
 
 # -------------------------------------------------
 # ENGAGEMENT SCORE
@@ -42,11 +44,16 @@ def calculate_pcs(
     comments: int,
     keyword: str,
     country: str,
+    trend_data: dict | None = None,
 ) -> dict:
     engagement = calculate_engagement_score(views, likes, comments)
     volume = calculate_volume_score(views)
 
-    trend_data = get_trend_score(keyword, country)
+    # Callers that already looked up trends pass them in to skip the fetch
+    if trend_data is None:
+        from fetcher.google_trends import get_trend_score
+        trend_data = get_trend_score(keyword, country)
+
     trend_score = trend_data["trend_score"]
 
     return {
@@ -58,10 +65,68 @@ def calculate_pcs(
     }
 
 
+# -------------------------------------------------
+# AGGREGATION
+# -------------------------------------------------
+
+def aggregate_stats(stats: list[tuple], policy: str, top_k: int = 3) -> tuple:
+    """
+    Collapse the count tuples (views first) of every item matching one
+    workflow into a single tuple:
+    - sum:    totals over all items
+    - median: per-metric median
+    - top_k:  totals over the `top_k` most viewed items
+    """
+    if policy == "sum":
+        return tuple(sum(column) for column in zip(*stats))
+
+    if policy == "median":
+        return tuple(int(round(median(column))) for column in zip(*stats))
+
+    if policy == "top_k":
+        top = sorted(stats, key=lambda s: s[0], reverse=True)[:top_k]
+        return tuple(sum(column) for column in zip(*top))
+
+    raise ValueError(f"Unknown aggregation policy: {policy}")
+
+
 # -------------------------------------------------
 # HUMAN-READABLE EXPLANATION
 # -------------------------------------------------
 
+# Explanation codes: bit flags for each reason, NO_DATA when views <= 0
+REASON_LIKES = 1
+REASON_DISCUSSION = 2
+REASON_REACH = 4
+REASON_RISING = 8
+NO_DATA = -1
+
+_REASON_TEXT = [
+    (REASON_LIKES, "strong like engagement"),
+    (REASON_DISCUSSION, "active discussion"),
+    (REASON_REACH, "high reach"),
+    (REASON_RISING, "rising search interest"),
+]
+
+
+def explain_code(code: int) -> str:
+    """
+    Text for an explanation code (see generate_explanation / score_batch).
+    """
+    if code == NO_DATA:
+        return "No engagement data available."
+
+    reasons = [text for flag, text in _REASON_TEXT if code & flag]
+
+    if not reasons:
+        return "Moderate popularity based on engagement, reach, and trend signals."
+
+    return "Ranks high due to " + ", ".join(reasons) + "."
+
+
+EXPLANATIONS = {code: explain_code(code) for code in range(NO_DATA, 16)}
+
+
 def generate_explanation(
     views: int,
     likes: int,
@@ -69,23 +134,103 @@ def generate_explanation(
     trend_direction: str,
 ) -> str:
     if views <= 0:
-        return "No engagement data available."
+        return explain_code(NO_DATA)
 
-    reasons = []
+    code = 0
 
     if likes / views >= 0.02:
-        reasons.append("strong like engagement")
+        code |= REASON_LIKES
 
     if comments / views >= 0.003:
-        reasons.append("active discussion")
+        code |= REASON_DISCUSSION
 
     if views >= 50_000:
-        reasons.append("high reach")
+        code |= REASON_REACH
 
     if trend_direction == "up":
-        reasons.append("rising search interest")
+        code |= REASON_RISING
 
-    if not reasons:
-        return "Moderate popularity based on engagement, reach, and trend signals."
+    return explain_code(code)
 
-    return "Ranks high due to " + ", ".join(reasons) + "."
+
+# -------------------------------------------------
+# BATCH SCORING (vectorized, no network)
+# -------------------------------------------------
+
+# Trend score per stored direction (mirrors fetcher.google_trends);
+# rows without interest data got the default fallback score
+TREND_DIRECTION_SCORES = {"up": 20, "down": 5, "stable": 10}
+DEFAULT_TREND_SCORE = 5
+
+
+def score_batch(views, likes, comments, trend_scores, trend_directions) -> dict:
+    """
+    Score whole columns at once.
+
+    Takes equal-length sequences of raw counts plus precomputed trend
+    scores/directions and returns NumPy arrays for every score column,
+    the two ratios and `explanation_code` (see explain_code / EXPLANATIONS).
+    Matches calculate_pcs + generate_explanation row for row.
+    """
+    views = np.asarray(views, dtype=np.int64)
+    likes = np.asarray(likes, dtype=np.int64)
+    comments = np.asarray(comments, dtype=np.int64)
+    trend_scores = np.asarray(trend_scores, dtype=np.int64)
+    trend_directions = np.asarray(trend_directions, dtype=object)
+
+    has_views = views > 0
+    safe_views = np.where(has_views, views, 1)
+
+    like_ratio = np.where(has_views, likes / safe_views, 0.0)
+    comment_ratio = np.where(has_views, comments / safe_views, 0.0)
+
+    # Engagement
+    like_score = np.minimum(like_ratio * 800, 25)
+    comment_score = np.minimum(comment_ratio * 3000, 15)
+    engagement = (like_score + comment_score).astype(np.int64)
+
+    # Volume
+    volume = np.select(
+        [views > 100_000, views > 50_000, views > 10_000],
+        [40, 30, 20],
+        default=10,
+    ).astype(np.int64)
+
+    # Explanation codes
+    codes = (
+        (like_ratio >= 0.02) * REASON_LIKES
+        | (comment_ratio >= 0.003) * REASON_DISCUSSION
+        | (views >= 50_000) * REASON_REACH
+        | (trend_directions == "up") * REASON_RISING
+    )
+    codes = np.where(has_views, codes, NO_DATA)
+
+    return {
+        "popularity_score": engagement + volume + trend_scores,
+        "engagement_score": engagement,
+        "volume_score": volume,
+        "trend_score": trend_scores,
+        "like_to_view_ratio": like_ratio,
+        "comment_to_view_ratio": comment_ratio,
+        "explanation_code": codes,
+    }
+
+
+def trend_scores_from_stored(trend_directions, trend_freshness) -> np.ndarray:
+    """
+    Rebuild trend scores from stored trend_direction / trend_freshness
+    so rows can be rescored without calling Trends.
+
+    Only rows scored with the fallback (freshness "default", or no
+    direction at all) get DEFAULT_TREND_SCORE; real Trends data with
+    zero interest is "stable" like any other.
+    """
+    directions = np.asarray(trend_directions, dtype=object)
+    freshness = np.asarray(trend_freshness, dtype=object)
+
+    scores = np.full(len(directions), DEFAULT_TREND_SCORE, dtype=np.int64)
+    for direction, score in TREND_DIRECTION_SCORES.items():
+        scores[directions == direction] = score
+
+    scores[freshness == "default"] = DEFAULT_TREND_SCORE
+    return scores
@@ -0,0 +1,412 @@
+"""
+Offline benchmark suite
+No network, no credentials, no quota: every source is served by
+benchmarks.stub_servers and the database is a throwaway SQLite file.
+
+    python -m benchmarks.run --sizes 1000,100000,1000000 --output bench.json
+
+Suites:
+- ingestion: run_all_ingestions against the stubs (first run cold, the
+  rest warm: Trends cache and ETag revalidation in effect)
+- upsert:    bulk_upsert_workflows while seeding each size, then
+  single-row upsert_workflow calls
+- api:       GET /workflows through the ASGI app, paging with cursors,
+  with the read cache cleared (cold) and warm
+- taxonomy:  fetcher.taxonomy.classify over distinct titles (cold) and
+  the same titles again (LRU cache)
+
+Results are written as JSON: throughput plus p50 / p99 / max latency
+per benchmark and table size.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.stub_servers import StubConfig, StubServer
+
+DEFAULT_SIZES = "1000,100000,1000000"
+SEED_CHUNK_SIZE = 10_000
+
+# -------------------------------------------------
+# HELPERS
+# -------------------------------------------------
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(benchmark: str, latencies: list, items: int | None = None, **extra) -> dict:
+    """
+    One result record. `latencies` are per-operation seconds; throughput
+    counts `items` (default: operations) per second of total latency.
+    """
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    count = len(ordered) if items is None else items
+
+    return {
+        "benchmark": benchmark,
+        **extra,
+        "ops": len(ordered),
+        "items": count,
+        "seconds": round(total, 6),
+        "throughput_per_s": round(count / total, 2) if total else None,
+        "p50_ms": round(_percentile(ordered, 50) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def _configure_environment(workdir: str):
+    """
+    Point the app at a scratch database / HTTP cache. Must run before
+    anything under app/ or fetcher/ is imported.
+    """
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.pop("DATABASE_READ_URL", None)
+    os.environ.pop("ASYNC_DATABASE_READ_URL", None)
+    os.environ["HTTP_CACHE_DIR"] = os.path.join(workdir, "http_cache")
+    os.environ.setdefault("YOUTUBE_API_KEY", "benchmark")
+    # Every run gets the same search budget, however many ran today
+    os.environ.setdefault("YOUTUBE_DAILY_QUOTA", str(10**9))
+    # The stubs never throttle; measure the pipeline, not the limiter
+    os.environ.setdefault("TRENDS_RATE_PER_MINUTE", "0")
+
+
+def _point_fetchers_at(url: str):
+    from pytrends import request as pytrends_request
+
+    from fetcher import forum_fetcher, youtube_fetcher
+
+    youtube_fetcher.BASE_URL = f"{url}/youtube/v3"
+    forum_fetcher.BASE_URL = url
+
+    pytrends_request.BASE_TRENDS_URL = f"{url}/trends"
+    pytrends_request.TrendReq.GENERAL_URL = f"{url}/trends/api/explore"
+    pytrends_request.TrendReq.INTEREST_OVER_TIME_URL = f"{url}/trends/api/widgetdata/multiline"
+
+# -------------------------------------------------
+# SUITES
+# -------------------------------------------------
+
+def bench_ingestion(args, workdir: str) -> list:
+    from app import jobs
+    from fetcher import http_client
+    from scripts import run_ingestion
+
+    jobs.INGEST_LOCK_PATH = os.path.join(workdir, "ingestion.lock")
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        videos=args.videos,
+        topics=args.topics,
+        seed=args.seed,
+    )
+
+    runs = []
+    with StubServer(config) as stub:
+        _point_fetchers_at(stub.url)
+
+        for _ in range(args.ingestion_runs):
+            summary = {}
+
+            def progress(source, **fields):
+                summary.setdefault(source, {}).update(fields)
+
+            requests_before = stub.stats()["requests"]
+            start = time.perf_counter()
+            try:
+                run_ingestion.run_all_ingestions(progress=progress)
+                failed = False
+            except RuntimeError:
+                # Some source failed (e.g. --error-rate beyond the retries)
+                failed = True
+
+            runs.append({
+                "seconds": time.perf_counter() - start,
+                "items": sum(state.get("items") or 0 for state in summary.values()),
+                "requests": stub.stats()["requests"] - requests_before,
+                "failed": failed,
+            })
+
+        stub_stats = stub.stats()
+
+    results = []
+    for name, group in (("cold", runs[:1]), ("warm", runs[1:])):
+        if not group:
+            continue
+        results.append(summarize(
+            f"run_all_ingestions.{name}",
+            [run["seconds"] for run in group],
+            items=sum(run["items"] for run in group),
+            requests=sum(run["requests"] for run in group),
+            failed_runs=sum(run["failed"] for run in group),
+        ))
+
+    results[-1]["stub"] = stub_stats
+    results[-1]["http"] = http_client.stats()
+    return results
+
+
+class Seeder:
+    """
+    Grows the workflows table to each requested size with
+    bulk_upsert_workflows, timing every chunk.
+    """
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.next_index = 0
+
+    def row(self, i: int) -> dict:
+        """
+        Workflow number `i` with fresh random counts and scores.
+        """
+        views = self.rng.randint(0, 500_000)
+        return {
+            "name": f"Benchmark Workflow {i}",
+            "platform": ("YouTube", "Forum")[i % 2],
+            "country": ("US", "IN")[(i // 2) % 2],
+            "views": views,
+            "likes": views // self.rng.randint(20, 200),
+            "comments": views // self.rng.randint(200, 2000),
+            "popularity_score": self.rng.randint(0, 100),
+            "engagement_score": self.rng.randint(0, 40),
+            "volume_score": self.rng.choice((10, 20, 30, 40)),
+            "trend_score": self.rng.choice((5, 10, 20)),
+            "trend_direction": self.rng.choice(("up", "down", "stable")),
+            "trend_avg_interest": round(self.rng.uniform(0, 100), 2),
+            "explanation": "Benchmark row.",
+        }
+
+    def grow_to(self, db, size: int) -> tuple:
+        """
+        Returns (per-chunk seconds, rows inserted).
+        """
+        from app.crud import bulk_upsert_workflows
+        from app.models import Workflow
+
+        latencies = []
+        inserted = 0
+        missing = size - db.query(Workflow).count()
+        run_ts = datetime.utcnow()
+
+        while missing > 0:
+            count = min(SEED_CHUNK_SIZE, missing)
+            rows = [self.row(i) for i in range(self.next_index, self.next_index + count)]
+            self.next_index += count
+
+            start = time.perf_counter()
+            bulk_upsert_workflows(db, rows, run_ts=run_ts)
+            latencies.append(time.perf_counter() - start)
+
+            inserted += count
+            missing -= count
+
+        return latencies, inserted
+
+
+def bench_upsert(args, db, size: int, seeded: tuple, seeder: Seeder) -> list:
+    from app.crud import upsert_workflow
+
+    results = []
+    seed_latencies, inserted = seeded
+    if seed_latencies:
+        results.append(summarize(
+            "bulk_upsert_workflows",
+            seed_latencies,
+            items=inserted,
+            rows=size,
+            chunk_size=SEED_CHUNK_SIZE,
+        ))
+
+    rng = random.Random(args.seed + size)
+    latencies = []
+    for _ in range(args.upsert_ops):
+        # Updates of existing keys, like repeated ingestion runs
+        row = seeder.row(rng.randrange(seeder.next_index))
+
+        start = time.perf_counter()
+        upsert_workflow(db, row)
+        latencies.append(time.perf_counter() - start)
+
+    results.append(summarize("upsert_workflow", latencies, rows=size))
+    return results
+
+
+def bench_api(args, client, size: int) -> list:
+    """
+    cold: pages through the ranking with cursors, read cache cleared
+          before every request, so each one hits the database
+    warm: the first page over and over, served from the read cache
+    """
+    import app.main as api
+
+    def page_through(params: dict) -> list:
+        latencies = []
+        cursor = None
+        for _ in range(args.api_requests):
+            api._leaderboard_cache.clear()
+
+            query = dict(params, cursor=cursor) if cursor else params
+            start = time.perf_counter()
+            response = client.get("/workflows", params=query)
+            latencies.append(time.perf_counter() - start)
+
+            response.raise_for_status()
+            # Wraps around to the first page at the end of the ranking
+            cursor = response.headers.get("X-Next-Cursor")
+        return latencies
+
+    def repeat_first_page(params: dict) -> list:
+        client.get("/workflows", params=params).raise_for_status()
+
+        latencies = []
+        for _ in range(args.api_requests):
+            start = time.perf_counter()
+            response = client.get("/workflows", params=params)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+        return latencies
+
+    results = []
+    for label, params in (
+        ("all", {"limit": args.page_size}),
+        ("filtered", {"limit": args.page_size, "platform": "YouTube", "country": "US"}),
+    ):
+        for mode, run in (("cold", page_through), ("warm", repeat_first_page)):
+            results.append(summarize(
+                f"GET /workflows.{label}.{mode}",
+                run(params),
+                rows=size,
+                page_size=args.page_size,
+            ))
+    return results
+
+
+def bench_taxonomy(args) -> list:
+    from benchmarks.stub_servers import _title
+    from fetcher.taxonomy import Taxonomy, load_vocabulary
+
+    # Fresh instance: a cache large enough for every title, nothing cached yet
+    taxonomy = Taxonomy(load_vocabulary(), cache_size=args.titles)
+    titles = [_title(n) for n in range(args.titles)]
+
+    results = []
+    for mode in ("cold", "cached"):
+        start = time.perf_counter()
+        taxonomy.classify(titles)
+        results.append(summarize(
+            f"taxonomy.classify.{mode}",
+            [time.perf_counter() - start],
+            items=len(titles),
+            keywords=len(taxonomy.labels),
+        ))
+    return results
+
+# -------------------------------------------------
+# ENTRY POINT
+# -------------------------------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ingestion / API benchmarks")
+    parser.add_argument("--suites", default="ingestion,upsert,api,taxonomy",
+                        help="comma separated: ingestion, upsert, api, taxonomy")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="workflows table sizes for the upsert / api suites")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--seed", type=int, default=0)
+
+    stubs = parser.add_argument_group("stub servers")
+    stubs.add_argument("--latency-ms", type=float, default=20.0)
+    stubs.add_argument("--jitter-ms", type=float, default=5.0)
+    stubs.add_argument("--error-rate", type=float, default=0.0)
+    stubs.add_argument("--videos", type=int, default=2_000,
+                       help="distinct videos behind the fake YouTube search")
+    stubs.add_argument("--topics", type=int, default=300,
+                       help="topics served by the fake /latest.json")
+
+    runs = parser.add_argument_group("workload")
+    runs.add_argument("--ingestion-runs", type=int, default=3)
+    runs.add_argument("--upsert-ops", type=int, default=500)
+    runs.add_argument("--api-requests", type=int, default=500)
+    runs.add_argument("--page-size", type=int, default=50)
+    runs.add_argument("--titles", type=int, default=1_000_000,
+                      help="titles classified by the taxonomy suite")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    suites = {s.strip() for s in args.suites.split(",") if s.strip()}
+    sizes = sorted(int(s) for s in args.sizes.split(",") if s.strip())
+
+    workdir = tempfile.mkdtemp(prefix="workflow-bench-")
+    _configure_environment(workdir)
+
+    report = {
+        "started_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": [],
+    }
+
+    try:
+        from app.database import SessionLocal
+        from app.migrations import migrate
+
+        migrate()
+
+        if "ingestion" in suites:
+            report["results"] += bench_ingestion(args, workdir)
+
+        if "taxonomy" in suites:
+            report["results"] += bench_taxonomy(args)
+
+        if suites & {"upsert", "api"}:
+            from fastapi.testclient import TestClient
+
+            import app.main as api
+
+            seeder = Seeder(args.seed)
+            db = SessionLocal()
+            try:
+                with TestClient(api.app) as client:
+                    for size in sizes:
+                        seeded = seeder.grow_to(db, size)
+                        if "upsert" in suites:
+                            report["results"] += bench_upsert(args, db, size, seeded, seeder)
+                        if "api" in suites:
+                            report["results"] += bench_api(args, client, size)
+            finally:
+                db.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
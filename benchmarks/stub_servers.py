@@ -0,0 +1,301 @@
+"""
+Local HTTP stand-ins for the ingestion sources
+YouTube Data API (/youtube/v3/search, /youtube/v3/videos), the Discourse
+/latest.json feed and the Google Trends endpoints pytrends calls.
+
+Responses follow the recorded shapes of the real APIs and are generated
+deterministically from the request, so runs are repeatable. Latency,
+error rate and dataset sizes are configurable per server.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Title fragments; most are integrations in fetcher.taxonomy
+TITLE_TOPICS = [
+    "slack", "gmail", "google sheets", "whatsapp", "notion", "telegram", "ai",
+    "webhook", "api", "crm",
+]
+
+TOPICS_PER_PAGE = 30
+TRENDS_POINTS = 13
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 0.0
+    # Uniform +/- jitter applied to latency_ms
+    jitter_ms: float = 0.0
+    # Share of requests answered 503 (exercises the client retry path)
+    error_rate: float = 0.0
+    # Distinct videos the fake YouTube search draws from
+    videos: int = 2_000
+    # Result pages per search before nextPageToken runs out
+    search_pages: int = 5
+    # Topics served by /latest.json across all pages
+    topics: int = 300
+    # Answer If-None-Match with 304 when the body is unchanged
+    etags: bool = True
+    seed: int = 0
+
+
+def _stable_int(*parts) -> int:
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _title(n: int) -> str:
+    first = TITLE_TOPICS[n % len(TITLE_TOPICS)]
+    second = TITLE_TOPICS[(n // len(TITLE_TOPICS)) % len(TITLE_TOPICS)]
+    return f"n8n {first} {second} automation tutorial #{n}"
+
+# -------------------------------------------------
+# RESPONSES
+# -------------------------------------------------
+
+def youtube_search(config: StubConfig, params: dict) -> dict:
+    query = params.get("q", "")
+    region = params.get("regionCode", "")
+    max_results = min(int(params.get("maxResults", 5)), 50)
+    page = int(params.get("pageToken", "page0").removeprefix("page") or 0)
+
+    start = _stable_int(config.seed, query, region) % config.videos
+    first = page * max_results
+    numbers = [(start + (first + i) * 7) % config.videos for i in range(max_results)]
+    response = {
+        "kind": "youtube#searchListResponse",
+        "items": [
+            {
+                "kind": "youtube#searchResult",
+                "id": {"kind": "youtube#video", "videoId": f"vid{n:07d}"},
+                "snippet": {"title": _title(n)},
+            }
+            for n in numbers
+        ],
+    }
+    if page + 1 < config.search_pages:
+        response["nextPageToken"] = f"page{page + 1}"
+
+    return response
+
+
+def youtube_videos(config: StubConfig, params: dict) -> dict:
+    items = []
+    for video_id in filter(None, params.get("id", "").split(",")):
+        n = _stable_int(config.seed, video_id)
+        views = n % 500_000
+        items.append({
+            "kind": "youtube#video",
+            "id": video_id,
+            "snippet": {"title": _title(int(video_id.removeprefix("vid") or 0))},
+            "statistics": {
+                "viewCount": str(views),
+                "likeCount": str(views * (n % 40) // 1000),
+                "commentCount": str(views * (n % 7) // 1000),
+            },
+        })
+    return {"kind": "youtube#videoListResponse", "items": items}
+
+
+def discourse_latest(config: StubConfig, params: dict) -> dict:
+    page = int(params.get("page", 0))
+    first = page * TOPICS_PER_PAGE
+    last = min(first + TOPICS_PER_PAGE, config.topics)
+    newest = datetime(2026, 1, 1)
+
+    topic_list = {
+        "topics": [
+            {
+                "id": topic_id,
+                "title": _title(topic_id),
+                "posts_count": _stable_int(config.seed, "posts", topic_id) % 60 + 1,
+                "like_count": _stable_int(config.seed, "likes", topic_id) % 200,
+                "views": _stable_int(config.seed, "views", topic_id) % 20_000,
+                "pinned": False,
+                # Newest first, one hour apart
+                "bumped_at": (newest - timedelta(hours=topic_id)).isoformat() + "Z",
+            }
+            for topic_id in range(first, last)
+        ],
+    }
+    if last < config.topics:
+        topic_list["more_topics_url"] = f"/latest?page={page + 1}"
+
+    return {"topic_list": topic_list}
+
+
+def trends_explore(config: StubConfig, params: dict) -> dict:
+    req = json.loads(params.get("req", "{}"))
+    return {
+        "widgets": [{
+            "id": "TIMESERIES",
+            "token": "stub-token",
+            "request": {
+                "keywords": [item["keyword"] for item in req.get("comparisonItem", [])],
+                "geo": next((item.get("geo") for item in req.get("comparisonItem", [])), ""),
+            },
+        }],
+    }
+
+
+def _interest(config: StubConfig, keyword: str, geo: str, week: int) -> int:
+    # Per-keyword base level plus a rising, flat or falling slope
+    slope = _stable_int(keyword) % 3 - 1
+    return max(0, min(100, _stable_int(config.seed, keyword, geo) % 80 + 10 + slope * week))
+
+
+def trends_multiline(config: StubConfig, params: dict) -> dict:
+    req = json.loads(params.get("req", "{}"))
+    keywords = req.get("keywords", [])
+    geo = req.get("geo", "")
+    start = int(datetime(2026, 1, 1).timestamp())
+
+    return {
+        "default": {
+            "timelineData": [
+                {
+                    "time": str(start + week * 7 * 86400),
+                    "value": [_interest(config, keyword, geo, week) for keyword in keywords],
+                    "isPartial": False,
+                }
+                for week in range(TRENDS_POINTS)
+            ],
+        },
+    }
+
+
+# Path -> (handler, prefix prepended to the JSON body)
+ROUTES = {
+    "/youtube/v3/search": (youtube_search, ""),
+    "/youtube/v3/videos": (youtube_videos, ""),
+    "/latest.json": (discourse_latest, ""),
+    "/trends/api/explore": (trends_explore, ")]}'"),
+    "/trends/api/widgetdata/multiline": (trends_multiline, ")]}',"),
+}
+
+# -------------------------------------------------
+# SERVER
+# -------------------------------------------------
+
+class StubServer:
+    """
+    Threaded HTTP server answering every ROUTES path on one port.
+    Use as a context manager; `url` is the base URL while running.
+    """
+
+    def __init__(self, config: StubConfig | None = None):
+        self.config = config or StubConfig()
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "not_modified": self.not_modified,
+            }
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def _delay_and_fail(self) -> bool:
+        config = self.config
+        with self._lock:
+            self.requests += 1
+            jitter = self._rng.uniform(-config.jitter_ms, config.jitter_ms)
+            fail = self._rng.random() < config.error_rate
+            if fail:
+                self.errors += 1
+
+        delay = max(config.latency_ms + jitter, 0.0) / 1000
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._respond()
+
+            def do_POST(self):
+                self._respond()
+
+            def _respond(self):
+                # Drain any request body so keep-alive connections stay in sync
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+
+                parts = urlsplit(self.path)
+                params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+
+                # pytrends fetches a cookie from the explore page first
+                if parts.path.startswith("/trends/explore"):
+                    self._send(200, b"", headers={"Set-Cookie": "NID=stub; Path=/"})
+                    return
+
+                route = ROUTES.get(parts.path)
+                if route is None:
+                    self._send(404, b"")
+                    return
+
+                if stub._delay_and_fail():
+                    self._send(503, b"", headers={"Retry-After": "0"})
+                    return
+
+                handler, prefix = route
+                body = (prefix + json.dumps(handler(stub.config, params))).encode()
+                etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+                if stub.config.etags and self.headers.get("If-None-Match") == etag:
+                    with stub._lock:
+                        stub.not_modified += 1
+                    self._send(304, b"", headers={"ETag": etag})
+                    return
+
+                self._send(200, body, headers={"ETag": etag} if stub.config.etags else {})
+
+            def _send(self, status: int, body: bytes, headers: dict | None = None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -5,133 +5,317 @@ Source: n8n Community (Discourse)
 https://docs.discourse.org/
 """
 
-import requests
+import os
+import time
+from datetime import datetime
 
+from app import metrics
 from app.database import SessionLocal
-from app.crud import upsert_workflow
-from app.scoring import calculate_pcs,generate_explanation
-from fetcher.google_trends import get_trend_score
+from app.crud import (
+    bulk_upsert_workflows,
+    get_forum_watermark,
+    get_forum_topic_states,
+    get_forum_workflow_topics,
+    upsert_forum_topic_states,
+)
+from app.jobs import ingestion_lock
+from app.migrations import migrate
+from app.scoring import aggregate_stats, calculate_pcs, generate_explanation
+from fetcher import http_client
+from fetcher.google_trends import get_trend_scores
+from fetcher.taxonomy import classify
 
 BASE_URL = "https://community.n8n.io"
 REQUEST_TIMEOUT = 10
 
+# Safety cap on /latest pagination per run
+FORUM_MAX_PAGES = 20
+
+# How the topics mapping to one workflow name are combined: sum | median | top_k
+FORUM_AGGREGATION = os.getenv("FORUM_AGGREGATION", "sum")
+FORUM_AGGREGATION_TOP_K = int(os.getenv("FORUM_AGGREGATION_TOP_K", 3))
+
 # -------------------------------------------------
 # HELPERS
 # -------------------------------------------------
 
-def extract_workflow_name(title: str) -> str:
+def topic_bumped_at(topic: dict) -> datetime | None:
+    """
+    Last activity of a topic as naive UTC (Discourse sends ISO-8601 with Z).
+    """
+    value = topic.get("bumped_at") or topic.get("last_posted_at")
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _add_latest_page(
+    topics: list,
+    payload: dict,
+    limit: int,
+    since: datetime | None,
+) -> str | None:
     """
-    Normalize forum titles into workflow-style names.
-    Uses the same philosophy as YouTube normalization.
+    Append one /latest page to `topics`.
+    Returns the next page URL, or None once pagination should stop.
     """
-    title_lower = title.lower()
+    topic_list = payload["topic_list"]
+    page = topic_list.get("topics", [])
+    topics.extend(page)
 
-    keywords = {
-        "google sheets": "Google Sheets",
-        "gmail": "Gmail",
-        "slack": "Slack",
-        "whatsapp": "WhatsApp",
-        "notion": "Notion",
-        "telegram": "Telegram",
-        "ai": "AI",
-    }
+    if since is None:
+        if len(topics) >= limit:
+            return None
+    elif any(
+        not t.get("pinned")
+        and (topic_bumped_at(t) or since) <= since
+        for t in page
+    ):
+        return None
 
-    found = [
-        label
-        for key, label in keywords.items()
-        if key in title_lower
-    ]
+    more = topic_list.get("more_topics_url")
+    if not page or not more:
+        return None
 
-    if len(found) >= 2:
-        return f"{found[0]} → {found[1]} Workflow"
-    elif len(found) == 1:
-        return f"{found[0]} Workflow"
-    else:
-        return "General n8n Workflow"
+    # "/latest?page=1" -> "/latest.json?page=1"
+    path, _, query = more.partition("?")
+    return f"{BASE_URL}{path.removesuffix('.json')}.json?{query}"
 
 
-def fetch_latest_topics(limit: int = 50):
+def fetch_latest_topics(limit: int = 50, since: datetime | None = None):
     """
     Fetch latest topics from the n8n Discourse forum.
+
+    Follows `more_topics_url` pagination:
+    - without `since`, until `limit` topics are collected
+    - with `since`, until a page reaches topics bumped at or before it
+
+    With `since`, an unchanged (304) first page means nothing new since
+    the last run, and no topics are returned.
+
+    Returns (topics, receipts); pass the receipts to
+    http_client.mark_ingested() once the topics are committed.
     """
+    topics = []
+    receipts = []
     url = f"{BASE_URL}/latest.json"
-    response = requests.get(url, timeout=REQUEST_TIMEOUT)
-    response.raise_for_status()
-    return response.json()["topic_list"]["topics"][:limit]
+
+    for page_number in range(FORUM_MAX_PAGES):
+        # /latest is not region specific
+        with metrics.INGEST_STAGE_SECONDS.time(source="forum", country="all", stage="fetch"):
+            payload, not_modified, receipt = http_client.get_json(url, timeout=REQUEST_TIMEOUT)
+        if not_modified and since is not None and page_number == 0:
+            return [], []
+        receipts.append(receipt)
+
+        url = _add_latest_page(topics, payload, limit, since)
+        if url is None:
+            break
+
+    return (topics[:limit] if since is None else topics), receipts
+
+
+async def fetch_latest_topics_async(client, limit: int = 50, since: datetime | None = None):
+    """
+    fetch_latest_topics over an http_client.async_client().
+    """
+    topics = []
+    receipts = []
+    url = f"{BASE_URL}/latest.json"
+
+    for page_number in range(FORUM_MAX_PAGES):
+        with metrics.INGEST_STAGE_SECONDS.time(source="forum", country="all", stage="fetch"):
+            payload, not_modified, receipt = await http_client.async_get_json(
+                client, url, timeout=REQUEST_TIMEOUT
+            )
+        if not_modified and since is not None and page_number == 0:
+            return [], []
+        receipts.append(receipt)
+
+        url = _add_latest_page(topics, payload, limit, since)
+        if url is None:
+            break
+
+    return (topics[:limit] if since is None else topics), receipts
 
 # -------------------------------------------------
 # INGESTION PIPELINE
 # -------------------------------------------------
 
-def ingest_forum_workflows(country: str = "US", limit: int = 50):
+# Per-topic counts, as stored in forum_topic_state
+TOPIC_COUNT_FIELDS = ("posts_count", "like_count", "views", "contributors")
+
+
+def topic_counts(topic: dict) -> tuple:
     """
-    Ingest forum workflows.
-    Forum activity is sparse, so Google Trends is used
-    as a primary popularity signal.
+    A topic's TOPIC_COUNT_FIELDS values.
     """
-    db = SessionLocal()
+    return (
+        topic.get("posts_count", 1),
+        topic.get("like_count", 0),
+        topic.get("views", 0),
+        len(topic.get("posters", [])),
+    )
 
-    try:
-        topics = fetch_latest_topics(limit=limit)
 
-        for topic in topics:
-            title = topic.get("title", "")
-            workflow_name = extract_workflow_name(title)
+def build_forum_workflows(counts_by_workflow: dict, country: str) -> list:
+    """
+    Turn {workflow_name: [topic_counts, ...]} into scored workflow rows,
+    one per workflow, combining its topics with aggregate_stats
+    (FORUM_AGGREGATION). Forum activity is sparse, so Google Trends is
+    used as a primary popularity signal.
+    """
+    rows = []
+
+    # 🔥 GOOGLE TRENDS (PRIMARY SIGNAL FOR FORUM)
+    # One batched lookup for every distinct workflow name
+    with metrics.INGEST_STAGE_SECONDS.time(source="forum", country=country, stage="trends"):
+        trends = get_trend_scores(list(counts_by_workflow), country=country)
 
-            replies = max(topic.get("posts_count", 1) - 1, 0)
-            likes = topic.get("like_count", 0)
-            views = topic.get("views", 0)
-            contributors = len(topic.get("posters", []))
+    scoring_start = time.perf_counter()
 
-            # 🔥 GOOGLE TRENDS (PRIMARY SIGNAL FOR FORUM)
-            trend = get_trend_score(
-                keyword=workflow_name,
-                country=country
-            )
+    for workflow_name, counts in counts_by_workflow.items():
+        views, likes, replies, contributors = aggregate_stats(
+            [
+                (views, likes, max(posts_count - 1, 0), contributors)
+                for posts_count, likes, views, contributors in counts
+            ],
+            FORUM_AGGREGATION,
+            FORUM_AGGREGATION_TOP_K,
+        )
 
-            # PCS using forum engagement + trend
-            scores = calculate_pcs(
-                views=views,
-                likes=likes,
-                comments=replies,
-                keyword=workflow_name,
-                country=country
-            )
+        trend = trends[workflow_name]
 
-            explanation = generate_explanation(
-                views=views,
-                likes=likes,
-                comments=replies,
-                trend_direction=trend["trend_direction"]
-            )
+        # PCS using forum engagement + trend
+        scores = calculate_pcs(
+            views=views,
+            likes=likes,
+            comments=replies,
+            keyword=workflow_name,
+            country=country,
+            trend_data=trend
+        )
 
-            workflow_data = {
-                "name": workflow_name,
-                "platform": "Forum",
-                "country": country,
+        explanation = generate_explanation(
+            views=views,
+            likes=likes,
+            comments=replies,
+            trend_direction=trend["trend_direction"]
+        )
+
+        workflow_data = {
+            "name": workflow_name,
+            "platform": "Forum",
+            "country": country,
+
+            "views": views,
+            "likes": likes,
+            "comments": replies,
+            "replies": replies,
+            "contributors": contributors,
+
+            "like_to_view_ratio": (likes / views) if views else 0,
+            "comment_to_view_ratio": (replies / views) if views else 0,
 
-                "views": views,
-                "likes": likes,
-                "comments": replies,
-                "replies": replies,
-                "contributors": contributors,
+            "popularity_score": scores["popularity_score"],
+            "engagement_score": scores["engagement_score"],
+            "volume_score": scores["volume_score"],
+            "trend_score": scores["trend_score"],
+            "trend_direction": trend["trend_direction"],
+            "trend_avg_interest": trend["avg_interest"],
+            "trend_freshness": trend["trend_freshness"],
+            
 
-                "like_to_view_ratio": (likes / views) if views else 0,
-                "comment_to_view_ratio": (replies / views) if views else 0,
+            "explanation": explanation,
+        }
 
-                "popularity_score": scores["popularity_score"],
-                "engagement_score": scores["engagement_score"],
-                "volume_score": scores["volume_score"],
-                "trend_score": scores["trend_score"],
-                "trend_direction": trend["trend_direction"],
-                "trend_avg_interest": trend["avg_interest"],
-                
+        rows.append(workflow_data)
+
+    metrics.INGEST_STAGE_SECONDS.observe(
+        time.perf_counter() - scoring_start, source="forum", country=country, stage="scoring"
+    )
+    return rows
+
+
+def ingest_forum_topics(
+    db,
+    topics: list,
+    country: str,
+    run_ts: datetime | None = None,
+) -> tuple:
+    """
+    Rescore the workflows of topics that are new or whose counts changed
+    since they were last scored for this country.
+
+    Each workflow row aggregates every scored topic mapping to it (its
+    stored counts, or this run's for changed topics), so it does not
+    depend on which of its topics happened to change.
+
+    Topics whose workflow was scored without fresh Trends data are
+    written but not recorded as scored, so the next run rescores them.
+    Returns (rescored, complete), complete being False when any topic
+    was left for later.
+    """
+    states = get_forum_topic_states(db, country, [t["id"] for t in topics if "id" in t])
 
-                "explanation": explanation,
+    changed = []
+    for topic in topics:
+        if "id" in topic and states.get(topic["id"]) == topic_counts(topic)[:3]:
+            continue
+        changed.append(topic)
+
+    names = classify([t.get("title", "") for t in changed], suffix="Workflow")
+    changed_ids = {t["id"] for t in changed if "id" in t}
+
+    # Stored topics of the affected workflows, then this run's counts
+    counts_by_workflow = {name: [] for name in names}
+    stored = get_forum_workflow_topics(db, country, counts_by_workflow)
+    for name, topic_states in stored.items():
+        counts_by_workflow[name].extend(
+            counts for topic_id, counts in topic_states.items()
+            if topic_id not in changed_ids
+        )
+    for topic, name in zip(changed, names):
+        counts_by_workflow[name].append(topic_counts(topic))
+
+    rows = build_forum_workflows(counts_by_workflow, country)
+    fresh = {row["name"] for row in rows if row["trend_freshness"] == "fresh"}
+    scored = [(topic, name) for topic, name in zip(changed, names) if name in fresh]
+
+    with metrics.INGEST_STAGE_SECONDS.time(source="forum", country=country, stage="db_write"):
+        bulk_upsert_workflows(db, rows, run_ts=run_ts)
+
+        upsert_forum_topic_states(db, [
+            {
+                "topic_id": topic["id"],
+                "country": country,
+                "bumped_at": topic_bumped_at(topic),
+                **dict(zip(TOPIC_COUNT_FIELDS, topic_counts(topic))),
+                "workflow_name": name,
             }
+            for topic, name in scored
+            if "id" in topic
+        ])
+
+    return len(changed), len(scored) == len(changed)
 
-            upsert_workflow(db, workflow_data)
 
+def ingest_forum_workflows(country: str = "US", limit: int = 50):
+    """
+    Incremental forum ingestion for one country.
+    """
+    db = SessionLocal()
+    try:
+        since = get_forum_watermark(db, country)
+        topics, receipts = fetch_latest_topics(limit=limit, since=since)
+        _, complete = ingest_forum_topics(db, topics, country)
+
+        # Only a fully scored page may be skipped as unchanged next time
+        if complete:
+            http_client.mark_ingested(receipts)
     finally:
         db.close()
 
@@ -140,6 +324,11 @@ def ingest_forum_workflows(country: str = "US", limit: int = 50):
 # -------------------------------------------------
 
 if __name__ == "__main__":
-    ingest_forum_workflows(country="US", limit=50)
-    ingest_forum_workflows(country="IN", limit=50)
-    print("Forum workflows ingested successfully.")
+    # Never alongside a scheduled run or /ingest
+    with ingestion_lock():
+        # Existing databases need the upsert conflict index / new columns
+        migrate()
+
+        ingest_forum_workflows(country="US", limit=50)
+        ingest_forum_workflows(country="IN", limit=50)
+        print("Forum workflows ingested successfully.")
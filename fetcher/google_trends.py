@@ -1,8 +1,40 @@
 
-from pytrends.request import TrendReq
+import os
+import threading
+import time
 from statistics import mean
 
-pytrends = TrendReq(hl="en-US", tz=360)
+from app import metrics
+from fetcher.trends_cache import trends_cache
+
+_pytrends = None
+_pytrends_lock = threading.Lock()
+
+TRENDS_TIMEFRAME = "today 3-m"
+
+# Trends accepts up to 5 terms per payload; one slot is reserved for a
+# shared anchor so that interest is comparable across payloads.
+MAX_TERMS_PER_PAYLOAD = 5
+TRENDS_ANCHOR = os.getenv("TRENDS_ANCHOR", "n8n")
+ANCHOR_INTEREST = 50
+
+DEFAULT_TREND = {
+    "trend_score": 5,
+    "trend_direction": "stable",
+    "avg_interest": 0,
+    "monthly_search_volume": 0,
+    "growth_60d_pct": 0,
+}
+
+# Payloads (2 HTTP calls each) per minute, with bursts of up to
+# TRENDS_BURST; 0 disables the limit
+TRENDS_RATE_PER_MINUTE = float(os.getenv("TRENDS_RATE_PER_MINUTE", 20))
+TRENDS_BURST = int(os.getenv("TRENDS_BURST", 5))
+
+# Consecutive failed payloads before Trends calls fail fast; a 429
+# opens the breaker at once. After the cooldown one trial call is let through.
+TRENDS_BREAKER_FAILURES = int(os.getenv("TRENDS_BREAKER_FAILURES", 3))
+TRENDS_BREAKER_COOLDOWN_SECONDS = float(os.getenv("TRENDS_BREAKER_COOLDOWN_SECONDS", 300))
 
 # Rough category-based baseline volumes
 BASE_KEYWORD_VOLUME = {
@@ -14,6 +46,103 @@ BASE_KEYWORD_VOLUME = {
 }
 
 
+def get_pytrends():
+    """
+    Shared TrendReq client, built on first use: constructing it opens an
+    HTTP session and pytrends pulls in pandas.
+    """
+    global _pytrends
+
+    with _pytrends_lock:
+        if _pytrends is None:
+            from pytrends.request import TrendReq
+            _pytrends = TrendReq(hl="en-US", tz=360)
+        return _pytrends
+
+
+# -------------------------------------------------
+# RATE LIMITING / CIRCUIT BREAKER
+# -------------------------------------------------
+
+class TokenBucket:
+    """
+    `rate_per_minute` tokens refill continuously up to `capacity`;
+    acquire() blocks until one is available.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int):
+        self.rate = rate_per_minute / 60
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive failures (or a trip);
+    open -> half_open once `cooldown` seconds passed, allowing one trial
+    call whose outcome closes or re-opens it.
+    """
+
+    def __init__(self, failures: int, cooldown: float):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                return True
+            # Open, or half-open with its trial call in flight
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+
+    def record_failure(self, trip: bool = False):
+        with self._lock:
+            self.consecutive_failures += 1
+            if trip or self.state == "half_open" or self.consecutive_failures >= self.failures:
+                if self.state != "open":
+                    metrics.TRENDS_BREAKER_OPENS.inc()
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+_rate_limiter = TokenBucket(TRENDS_RATE_PER_MINUTE, TRENDS_BURST)
+_breaker = CircuitBreaker(TRENDS_BREAKER_FAILURES, TRENDS_BREAKER_COOLDOWN_SECONDS)
+
+
+def _is_throttled(error: Exception) -> bool:
+    # pytrends' TooManyRequestsError / ResponseError carry the response
+    return getattr(getattr(error, "response", None), "status_code", None) == 429
+
+
 def _estimate_base_volume(keyword: str) -> int:
     keyword = keyword.lower()
 
@@ -30,65 +159,160 @@ def get_trend_score(keyword: str, country: str = "US") -> dict:
     - Relative interest (Trends)
     - Estimated monthly search volume
     - 60-day growth percentage
+
+    Single-keyword form of `get_trend_scores`.
     """
+    return get_trend_scores([keyword], country)[keyword]
 
-    try:
-        pytrends.build_payload(
-            [keyword],
-            timeframe="today 3-m",
-            geo=country
-        )
-
-        data = pytrends.interest_over_time()
-
-        if data.empty or keyword not in data:
-            return {
-                "trend_score": 5,
-                "trend_direction": "stable",
-                "avg_interest": 0,
-                "monthly_search_volume": 0,
-                "growth_60d_pct": 0,
-            }
-
-        values = data[keyword].tolist()
-        avg_interest = mean(values)
-
-        mid = len(values) // 2
-        early_avg = mean(values[:mid])
-        recent_avg = mean(values[mid:])
-
-        if early_avg == 0:
-            growth_pct = 0
-        else:
-            growth_pct = round(((recent_avg - early_avg) / early_avg) * 100, 1)
-
-        # Direction + score
-        if growth_pct > 30:
-            direction = "up"
-            score = 20
-        elif growth_pct < -20:
-            direction = "down"
-            score = 5
+
+def _with_freshness(trend: dict, freshness: str) -> dict:
+    # No interest data at all scores exactly like the fallback
+    return {**trend, "trend_freshness": "default" if trend == DEFAULT_TREND else freshness}
+
+
+def get_trend_scores(keywords: list[str], country: str = "US") -> dict:
+    """
+    Batched trend lookup for every distinct keyword of a country.
+
+    Fresh results are served from `trends_cache`; the rest are fetched in
+    payloads of up to 4 keywords plus TRENDS_ANCHOR. When a lookup fails
+    (or the circuit breaker is open) the last known value past its TTL
+    is used, and DEFAULT_TREND only when there is none.
+
+    Every result carries `trend_freshness`: fresh, stale or default.
+    """
+    results = {}
+    missing = []
+
+    for keyword in dict.fromkeys(keywords):
+        cached = trends_cache.get(keyword, country, TRENDS_TIMEFRAME)
+        if cached is not None:
+            results[keyword] = _with_freshness(cached, "fresh")
         else:
-            direction = "stable"
-            score = 10
-
-        base_volume = _estimate_base_volume(keyword)
-        monthly_volume = int((avg_interest / 100) * base_volume)
-
-        return {
-            "trend_score": score,
-            "trend_direction": direction,
-            "avg_interest": round(avg_interest, 2),
-            "monthly_search_volume": monthly_volume,
-            "growth_60d_pct": growth_pct,
-        }
-
-    except Exception:
-        return {
-            "trend_score": 5,
-            "trend_direction": "stable",
-            "avg_interest": 0,
-            "monthly_search_volume": 0,
-            "growth_60d_pct": 0,
-        }
+            missing.append(keyword)
+
+    fetched = _fetch_trend_batch(missing, country) if missing else {}
+
+    for keyword in missing:
+        result = fetched.get(keyword)
+        if result is None:
+            stale = trends_cache.get_stale(keyword, country, TRENDS_TIMEFRAME)
+            if stale is not None:
+                metrics.TRENDS_FALLBACKS.inc(country=country, reason="stale")
+                results[keyword] = _with_freshness(stale, "stale")
+            else:
+                metrics.TRENDS_FALLBACKS.inc(country=country, reason="fetch_failed")
+                results[keyword] = _with_freshness(DEFAULT_TREND, "default")
+            continue
+
+        if result == DEFAULT_TREND:
+            metrics.TRENDS_FALLBACKS.inc(country=country, reason="no_data")
+
+        trends_cache.set(keyword, country, TRENDS_TIMEFRAME, result)
+        results[keyword] = _with_freshness(result, "fresh")
+
+    return results
+
+
+# -------------------------------------------------
+# TRENDS API CALLS
+# -------------------------------------------------
+
+def _fetch_trend_batch(keywords: list[str], country: str) -> dict:
+    """
+    Fetch keywords in anchored payloads.
+    Each payload is rescaled so the anchor averages ANCHOR_INTEREST;
+    keywords missing from a failed payload are left out of the result.
+    Payloads are rate limited and skipped while the breaker is open.
+    """
+    results = {}
+    want_anchor = TRENDS_ANCHOR in keywords
+    terms = [k for k in keywords if k != TRENDS_ANCHOR]
+
+    chunk_size = MAX_TERMS_PER_PAYLOAD - 1
+    chunks = [terms[i:i + chunk_size] for i in range(0, len(terms), chunk_size)]
+    if not chunks:
+        chunks = [[]]
+
+    for chunk in chunks:
+        if not _breaker.allow():
+            # Fail fast: no request, the caller falls back per keyword
+            metrics.TRENDS_PAYLOADS.inc(status="skipped")
+            continue
+
+        _rate_limiter.acquire()
+        try:
+            pytrends = get_pytrends()
+            pytrends.build_payload(
+                chunk + [TRENDS_ANCHOR],
+                timeframe=TRENDS_TIMEFRAME,
+                geo=country
+            )
+            data = pytrends.interest_over_time()
+        except Exception as e:
+            throttled = _is_throttled(e)
+            metrics.TRENDS_PAYLOADS.inc(status="throttled" if throttled else "failed")
+            _breaker.record_failure(trip=throttled)
+            continue
+
+        _breaker.record_success()
+        metrics.TRENDS_PAYLOADS.inc(status="ok")
+
+        if data.empty or TRENDS_ANCHOR not in data:
+            for keyword in chunk:
+                results[keyword] = dict(DEFAULT_TREND)
+            continue
+
+        anchor_avg = mean(data[TRENDS_ANCHOR].tolist())
+        scale = ANCHOR_INTEREST / anchor_avg if anchor_avg else 1.0
+
+        for keyword in chunk:
+            if keyword not in data:
+                results[keyword] = dict(DEFAULT_TREND)
+                continue
+            values = [v * scale for v in data[keyword].tolist()]
+            results[keyword] = _summarize_interest(keyword, values)
+
+        if want_anchor and TRENDS_ANCHOR not in results:
+            values = [v * scale for v in data[TRENDS_ANCHOR].tolist()]
+            results[TRENDS_ANCHOR] = _summarize_interest(TRENDS_ANCHOR, values)
+
+    return results
+
+
+def _summarize_interest(keyword: str, values: list[float]) -> dict:
+    if len(values) < 2:
+        return dict(DEFAULT_TREND)
+
+    avg_interest = mean(values)
+
+    mid = len(values) // 2
+    early_avg = mean(values[:mid])
+    recent_avg = mean(values[mid:])
+
+    if early_avg == 0:
+        growth_pct = 0
+    else:
+        growth_pct = round(((recent_avg - early_avg) / early_avg) * 100, 1)
+
+    # Direction + score
+    if growth_pct > 30:
+        direction = "up"
+        score = 20
+    elif growth_pct < -20:
+        direction = "down"
+        score = 5
+    else:
+        direction = "stable"
+        score = 10
+
+    base_volume = _estimate_base_volume(keyword)
+    monthly_volume = int((avg_interest / 100) * base_volume)
+
+    return {
+        "trend_score": score,
+        "trend_direction": direction,
+        "avg_interest": round(avg_interest, 2),
+        "monthly_search_volume": monthly_volume,
+        "growth_60d_pct": growth_pct,
+    }
@@ -0,0 +1,453 @@
+"""
+Shared HTTP client for fetchers
+Pooled keep-alive sessions per host, retries with backoff,
+per-host latency / retry counters and an on-disk conditional
+(ETag / Last-Modified) response cache.
+async_get / async_get_json are the httpx (asyncio) equivalents.
+
+A 304 only counts as "not modified" for a response whose validators
+were marked ingested (mark_ingested) after its data was committed, so
+a run that fails after fetching does not hide that data from the next.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from app import metrics
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+
+REQUEST_TIMEOUT = 10
+
+# Connections kept open (and max in flight) per host
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 8))
+
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 4))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 30))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+HTTP_CACHE_DIR = os.getenv(
+    "HTTP_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache"),
+)
+
+# Cache entries neither written nor revalidated for this long are pruned
+HTTP_CACHE_MAX_AGE_DAYS = float(os.getenv("HTTP_CACHE_MAX_AGE_DAYS", 7))
+
+# Credentials never become part of a cache key
+CACHE_KEY_EXCLUDED_PARAMS = {"key"}
+
+_sessions: dict = {}
+# {async client: {host: semaphore}}, HTTP_POOL_SIZE slots per host
+_async_host_slots = weakref.WeakKeyDictionary()
+_host_stats: dict = {}
+_lock = threading.Lock()
+
+# -------------------------------------------------
+# HELPERS
+# -------------------------------------------------
+
+def get_session(host: str) -> requests.Session:
+    """
+    One keep-alive session per host, with a blocking connection pool
+    so no more than HTTP_POOL_SIZE requests are in flight to it.
+    """
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=HTTP_POOL_SIZE,
+                pool_block=True,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def _retry_after(response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _backoff(attempt: int) -> float:
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+
+def _record(
+    host: str,
+    seconds: float,
+    status: int | str,
+    retried: bool = False,
+    failed: bool = False,
+    not_modified: bool = False,
+):
+    metrics.HTTP_RESPONSES.inc(host=host, status=status)
+    metrics.HTTP_REQUEST_SECONDS.observe(seconds, host=host)
+    if retried:
+        metrics.HTTP_RETRIES.inc(host=host)
+
+    with _lock:
+        entry = _host_stats.setdefault(host, {
+            "requests": 0,
+            "retries": 0,
+            "errors": 0,
+            "not_modified": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+        })
+        entry["requests"] += 1
+        entry["retries"] += int(retried)
+        entry["errors"] += int(failed)
+        entry["not_modified"] += int(not_modified)
+        entry["total_seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+
+def _cache_path(url: str, params: dict | None) -> str:
+    key_params = sorted(
+        (k, str(v))
+        for k, v in (params or {}).items()
+        if k not in CACHE_KEY_EXCLUDED_PARAMS
+    )
+    key = json.dumps([url, key_params])
+    return os.path.join(HTTP_CACHE_DIR, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+
+def _read_cache(path: str) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(path: str, entry: dict):
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+
+
+def _touch(path: str):
+    # Revalidated entries are still in use (see prune_cache)
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _conditional_headers(cached: dict | None) -> dict:
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    return headers
+
+
+def _validators(entry: dict) -> dict:
+    return {"etag": entry.get("etag"), "last_modified": entry.get("last_modified")}
+
+
+def _receipt(path: str, entry: dict) -> dict:
+    return {"path": path, **_validators(entry)}
+
+
+def _cache_response(path: str, response, payload) -> dict | None:
+    """
+    Store a 200 response; returns its receipt, or None without validators.
+    """
+    entry = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "body": payload,
+    }
+    if not (entry["etag"] or entry["last_modified"]):
+        return None
+
+    _write_cache(path, entry)
+    return _receipt(path, entry)
+
+
+def _cached_result(path: str, cached: dict) -> tuple:
+    # 304: the cached body is only "not modified" if it was ingested
+    _touch(path)
+    ingested = cached.get("ingested") == _validators(cached)
+    return cached["body"], ingested, _receipt(path, cached)
+
+
+def mark_ingested(receipts):
+    """
+    Record that the responses behind `receipts` (from get_json /
+    async_get_json) were committed. Call only after the write succeeded;
+    receipts superseded by a newer response are ignored.
+    """
+    for receipt in receipts:
+        if receipt is None:
+            continue
+
+        cached = _read_cache(receipt["path"])
+        if cached is None or _validators(cached) != _validators(receipt):
+            continue
+
+        cached["ingested"] = _validators(cached)
+        _write_cache(receipt["path"], cached)
+
+# -------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------
+
+def get(
+    url: str,
+    params: dict | None = None,
+    timeout: float = REQUEST_TIMEOUT,
+    headers: dict | None = None,
+) -> requests.Response:
+    """
+    GET with retries on 429/5xx and connection errors.
+    Honors Retry-After, otherwise backs off exponentially with jitter.
+    Raises for status once retries are exhausted.
+    """
+    host = urlsplit(url).netloc
+    session = get_session(host)
+
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        last_attempt = attempt == HTTP_MAX_RETRIES
+        start = time.perf_counter()
+
+        try:
+            response = session.get(url, params=params, timeout=timeout, headers=headers)
+        except (requests.ConnectionError, requests.Timeout):
+            _record(
+                host,
+                time.perf_counter() - start,
+                "error",
+                retried=not last_attempt,
+                failed=last_attempt,
+            )
+            if last_attempt:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+
+        elapsed = time.perf_counter() - start
+
+        if response.status_code in RETRY_STATUSES and not last_attempt:
+            _record(host, elapsed, response.status_code, retried=True)
+            delay = _retry_after(response)
+            time.sleep(min(delay, HTTP_BACKOFF_MAX) if delay is not None else _backoff(attempt))
+            continue
+
+        _record(
+            host,
+            elapsed,
+            response.status_code,
+            failed=response.status_code >= 400,
+            not_modified=response.status_code == 304,
+        )
+        response.raise_for_status()
+        return response
+
+
+def get_json(
+    url: str,
+    params: dict | None = None,
+    timeout: float = REQUEST_TIMEOUT,
+) -> tuple:
+    """
+    Conditional GET through the on-disk response cache.
+
+    Sends If-None-Match / If-Modified-Since when a cached copy exists.
+    Returns (payload, not_modified, receipt); on 304 the payload is the
+    cached body, and not_modified is True only if that body was marked
+    ingested. Pass the receipt to mark_ingested() once it is committed.
+    """
+    path = _cache_path(url, params)
+    cached = _read_cache(path)
+
+    response = get(url, params=params, timeout=timeout, headers=_conditional_headers(cached))
+
+    if response.status_code == 304 and cached:
+        return _cached_result(path, cached)
+
+    payload = response.json()
+    return payload, False, _cache_response(path, response, payload)
+
+
+def stats() -> dict:
+    """
+    Per-host request, retry, error, 304 and latency counters.
+    """
+    with _lock:
+        return {
+            host: {
+                **entry,
+                "avg_seconds": entry["total_seconds"] / entry["requests"],
+            }
+            for host, entry in _host_stats.items()
+        }
+
+
+def prune_cache(max_age_days: float = HTTP_CACHE_MAX_AGE_DAYS) -> int:
+    """
+    Delete cache entries (and leftover temp files) not written or
+    revalidated within `max_age_days`. Returns the number removed.
+    """
+    cutoff = time.time() - max_age_days * 86400
+
+    try:
+        names = os.listdir(HTTP_CACHE_DIR)
+    except FileNotFoundError:
+        return 0
+
+    removed = 0
+    for name in names:
+        path = os.path.join(HTTP_CACHE_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            # Replaced or removed concurrently
+            continue
+    return removed
+
+# -------------------------------------------------
+# ASYNC API (httpx)
+# -------------------------------------------------
+
+def async_client(max_connections: int = HTTP_POOL_SIZE) -> httpx.AsyncClient:
+    """
+    Keep-alive client for the async fetchers. At most `max_connections`
+    requests are in flight through it, and at most HTTP_POOL_SIZE to any
+    one host (as with get_session); the rest wait their turn.
+    Bound to the event loop it is first used on.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+    )
+
+
+def _host_slot(client: httpx.AsyncClient, host: str) -> asyncio.Semaphore:
+    slots = _async_host_slots.setdefault(client, {})
+    slot = slots.get(host)
+    if slot is None:
+        slot = slots[host] = asyncio.Semaphore(HTTP_POOL_SIZE)
+    return slot
+
+
+async def async_get(
+    client: httpx.AsyncClient,
+    url: str,
+    params: dict | None = None,
+    timeout: float = REQUEST_TIMEOUT,
+    headers: dict | None = None,
+) -> httpx.Response:
+    """
+    get() on an httpx.AsyncClient: same retries, backoff and counters.
+    """
+    host = urlsplit(url).netloc
+    # Waiting for a free pooled connection is not a timeout
+    timeout = httpx.Timeout(timeout, pool=None)
+
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        last_attempt = attempt == HTTP_MAX_RETRIES
+        start = time.perf_counter()
+
+        try:
+            async with _host_slot(client, host):
+                response = await client.get(url, params=params, timeout=timeout, headers=headers)
+        except (httpx.NetworkError, httpx.TimeoutException):
+            _record(
+                host,
+                time.perf_counter() - start,
+                "error",
+                retried=not last_attempt,
+                failed=last_attempt,
+            )
+            if last_attempt:
+                raise
+            await asyncio.sleep(_backoff(attempt))
+            continue
+
+        elapsed = time.perf_counter() - start
+
+        if response.status_code in RETRY_STATUSES and not last_attempt:
+            _record(host, elapsed, response.status_code, retried=True)
+            delay = _retry_after(response)
+            await asyncio.sleep(min(delay, HTTP_BACKOFF_MAX) if delay is not None else _backoff(attempt))
+            continue
+
+        _record(
+            host,
+            elapsed,
+            response.status_code,
+            failed=response.status_code >= 400,
+            not_modified=response.status_code == 304,
+        )
+        # httpx also raises for 3xx; only errors count here
+        if response.status_code >= 400:
+            response.raise_for_status()
+        return response
+
+
+async def async_get_json(
+    client: httpx.AsyncClient,
+    url: str,
+    params: dict | None = None,
+    timeout: float = REQUEST_TIMEOUT,
+) -> tuple:
+    """
+    get_json() on an httpx.AsyncClient, sharing the on-disk cache.
+    Returns (payload, not_modified, receipt).
+    """
+    path = _cache_path(url, params)
+    cached = _read_cache(path)
+
+    response = await async_get(
+        client, url, params=params, timeout=timeout, headers=_conditional_headers(cached)
+    )
+
+    if response.status_code == 304 and cached:
+        return _cached_result(path, cached)
+
+    payload = response.json()
+    return payload, False, _cache_response(path, response, payload)
@@ -0,0 +1,310 @@
+"""
+Workflow taxonomy
+Maps video / topic titles to workflow names ("Gmail → Slack Automation")
+using a vocabulary of integrations and their synonyms. Labels are named
+in vocabulary order, so "Slack to Gmail" and "Gmail to Slack" titles
+count towards the same workflow.
+
+The whole vocabulary is compiled into one regex, factored as a trie so
+matching cost depends on title length, not on the number of keywords.
+Keywords only match whole words: "ai" matches "AI agent" but not
+"email" or "maintain".
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+
+# Optional JSON file {"Label": ["synonym", ...]} merged over the
+# built-in vocabulary (same label replaces its synonyms)
+TAXONOMY_PATH = os.getenv("TAXONOMY_PATH")
+TAXONOMY_CACHE_SIZE = int(os.getenv("TAXONOMY_CACHE_SIZE", 65_536))
+
+# At most this many integrations appear in a workflow name
+MAX_LABELS = 2
+
+# Label -> synonyms, in the order labels appear in workflow names; the
+# lowercased label always matches too, so labels and synonyms that are
+# everyday words (Close, Linear, Box, Zoom, excel...) are left out.
+# Spaces, "-" and "_" in a synonym match any run of those in a title.
+INTEGRATIONS = {
+    # Google
+    "Google Sheets": ("gsheets", "google spreadsheet", "google spreadsheets"),
+    "Gmail": ("google mail",),
+    "Google Drive": ("gdrive",),
+    "Google Docs": ("google doc",),
+    "Google Calendar": ("gcal",),
+    "Google Forms": ("google form",),
+    "Google Analytics": ("ga4",),
+    "Google Ads": ("adwords",),
+    "Google BigQuery": ("bigquery",),
+    "Google Maps": (),
+    "Google Translate": (),
+    "Google Gemini": ("gemini",),
+    "YouTube": (),
+
+    # Messaging / chat
+    "Slack": (),
+    "WhatsApp": ("whatsapp business", "whats app"),
+    "Telegram": ("telegram bot",),
+    "Discord": ("discord bot",),
+    "Microsoft Teams": ("ms teams",),
+    "Mattermost": (),
+    "Rocket.Chat": ("rocketchat",),
+    "Facebook Messenger": ("messenger",),
+    "WeChat": (),
+    "Twilio": (),
+    "Vonage": (),
+
+    # Email / marketing
+    "Outlook": ("microsoft outlook", "outlook.com"),
+    "Mailchimp": ("mail chimp",),
+    "SendGrid": ("send grid",),
+    "Brevo": ("sendinblue",),
+    "ActiveCampaign": ("active campaign",),
+    "ConvertKit": ("kit.com",),
+    "Mailgun": (),
+    "Lemlist": (),
+
+    # CRM / sales
+    "HubSpot": ("hub spot",),
+    "Salesforce": ("sfdc",),
+    "Pipedrive": (),
+    "Zoho CRM": ("zoho",),
+    "Apollo": ("apollo.io",),
+    "GoHighLevel": ("go high level", "highlevel", "ghl"),
+
+    # Productivity / project management
+    "Notion": (),
+    "Airtable": ("air table",),
+    "Trello": (),
+    "Asana": (),
+    "Jira": ("jira software",),
+    "ClickUp": ("click up",),
+    "Monday.com": ("monday crm",),
+    "Todoist": (),
+    "Basecamp": (),
+    "Coda": ("coda.io",),
+    "Baserow": (),
+    "NocoDB": (),
+    "Calendly": (),
+    "Cal.com": (),
+    "Toggl": ("toggl track",),
+
+    # Microsoft / files
+    "Microsoft Excel": ("ms excel",),
+    "Microsoft Word": ("ms word",),
+    "OneDrive": ("one drive",),
+    "SharePoint": ("share point",),
+    "Dropbox": (),
+    "AWS S3": ("s3", "amazon s3"),
+
+    # Forms / surveys
+    "Typeform": (),
+    "Jotform": (),
+    "SurveyMonkey": ("survey monkey",),
+
+    # Social
+    "Twitter": ("x twitter", "tweet", "tweets"),
+    "LinkedIn": ("linked in",),
+    "Facebook": ("facebook page", "facebook pages"),
+    "Instagram": (),
+    "TikTok": ("tik tok",),
+    "Reddit": (),
+    "Pinterest": (),
+    "Facebook Ads": ("meta ads",),
+
+    # Commerce / payments / finance
+    "Shopify": (),
+    "WooCommerce": ("woo commerce",),
+    "Stripe": (),
+    "PayPal": ("pay pal",),
+    "Gumroad": (),
+    "QuickBooks": ("quickbooks online", "qbo"),
+    "Xero": (),
+
+    # Support
+    "Zendesk": (),
+    "Intercom": (),
+    "Freshdesk": (),
+    "Help Scout": ("helpscout",),
+
+    # Web / CMS / dev
+    "WordPress": ("word press",),
+    "Webflow": (),
+    "GitHub": ("git hub",),
+    "GitLab": ("git lab",),
+    "Bitbucket": (),
+    "Jenkins": (),
+    "Docker": (),
+    "Webhook": ("webhooks",),
+    "HTTP Request": ("http request node", "http requests"),
+    "RSS": ("rss feed", "rss feeds"),
+    "Cloudflare": (),
+    "Vercel": (),
+    "Netlify": (),
+    "Firebase": (),
+    "Supabase": (),
+
+    # Databases / vector stores
+    "PostgreSQL": ("postgres",),
+    "MySQL": ("mariadb",),
+    "MongoDB": ("mongo",),
+    "Redis": (),
+    "Snowflake": (),
+    "Elasticsearch": ("elastic search",),
+    "Pinecone": (),
+    "Qdrant": (),
+    "Weaviate": (),
+    "Milvus": (),
+
+    # AI models / tooling
+    "OpenAI": (
+        "open ai", "chatgpt", "chat gpt", "gpt", "gpt 3.5", "gpt 4", "gpt4",
+        "gpt 4o", "gpt4o", "gpt 5", "dall e", "dalle",
+    ),
+    "Anthropic": ("claude",),
+    "Mistral": ("mistral ai",),
+    "Ollama": (),
+    "Groq": (),
+    "DeepSeek": ("deep seek",),
+    "Perplexity": (),
+    "Hugging Face": ("huggingface",),
+    "LangChain": ("lang chain",),
+    "OpenRouter": ("open router",),
+    "ElevenLabs": ("eleven labs", "11labs"),
+    "DeepL": (),
+    "Apify": (),
+    "Firecrawl": (),
+    "AI": (
+        "a.i.", "artificial intelligence", "ai agent", "ai agents",
+        "llm", "llms", "rag",
+    ),
+}
+
+# -------------------------------------------------
+# COMPILATION
+# -------------------------------------------------
+
+_SEPARATORS = re.compile(r"[\s_\-]+")
+
+
+def _normalize(text: str) -> str:
+    return _SEPARATORS.sub(" ", text.strip().lower())
+
+
+def load_vocabulary(path: str | None = TAXONOMY_PATH) -> dict:
+    """
+    INTEGRATIONS, with the labels from the JSON file at `path` merged over it.
+    """
+    vocabulary = dict(INTEGRATIONS)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            vocabulary.update({label: tuple(synonyms) for label, synonyms in json.load(f).items()})
+    return vocabulary
+
+
+def _trie_regex(words) -> str:
+    """
+    Alternation of `words` factored on shared prefixes, e.g.
+    ["gmail", "google docs", "google drive"] -> g(?:mail|oogle d(?:ocs|rive))
+    (with the space standing for a separator class).
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        ends_here = "" in node
+        # Branches start with distinct characters, so order is irrelevant
+        branches = [
+            (r"[\s_\-]+" if char == " " else re.escape(char)) + emit(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            # Greedy: the longest keyword wins ("google sheets" over "google")
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return emit(trie)
+
+
+class Taxonomy:
+    """
+    Compiled vocabulary. `classify(titles)` names many titles at once;
+    repeated titles are answered from an LRU cache.
+    """
+
+    def __init__(self, vocabulary: dict, cache_size: int = TAXONOMY_CACHE_SIZE):
+        self.labels: dict = {}
+        # Position of each label in workflow names
+        self.rank = {label: i for i, label in enumerate(vocabulary)}
+        for label, synonyms in vocabulary.items():
+            for synonym in (label, *synonyms):
+                self.labels[_normalize(synonym)] = label
+
+        self.pattern = re.compile(
+            r"(?<![a-z0-9])(?:" + _trie_regex(self.labels) + r")(?![a-z0-9])"
+        )
+        self._name = lru_cache(maxsize=cache_size)(self._uncached_name)
+
+    def find(self, title: str) -> list:
+        """
+        Distinct labels in the order they appear in `title`.
+        """
+        found = []
+        for match in self.pattern.finditer(title.lower()):
+            label = self.labels[_normalize(match.group())]
+            if label not in found:
+                found.append(label)
+        return found
+
+    def _uncached_name(self, title: str, suffix: str) -> str:
+        found = sorted(self.find(title), key=self.rank.__getitem__)[:MAX_LABELS]
+        if not found:
+            return f"General n8n {suffix}"
+        return " → ".join(found) + f" {suffix}"
+
+    def workflow_name(self, title: str, suffix: str = "Automation") -> str:
+        """
+        "Gmail → Slack Automation", "Slack Automation" or
+        "General n8n Automation" when nothing matches. The first
+        MAX_LABELS labels found, in vocabulary order.
+        """
+        return self._name(title, suffix)
+
+    def classify(self, titles, suffix: str = "Automation") -> list:
+        name = self._name
+        return [name(title, suffix) for title in titles]
+
+    def stats(self) -> dict:
+        info = self._name.cache_info()
+        return {
+            "keywords": len(self.labels),
+            "cache_hits": info.hits,
+            "cache_misses": info.misses,
+            "cache_size": info.currsize,
+        }
+
+
+taxonomy = Taxonomy(load_vocabulary())
+
+
+def classify(titles, suffix: str = "Automation") -> list:
+    """
+    Workflow names for `titles` (see Taxonomy.workflow_name).
+    """
+    return taxonomy.classify(titles, suffix)
@@ -0,0 +1,188 @@
+"""
+Google Trends cache
+In-process LRU in front of a SQLite-backed table
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal, engine
+from app.models import TrendCacheEntry
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+
+TRENDS_CACHE_TTL_SECONDS = int(os.getenv("TRENDS_CACHE_TTL_SECONDS", 24 * 3600))
+# Expired rows are kept this long as last-known-good values for when
+# Trends is failing
+TRENDS_CACHE_STALE_SECONDS = int(os.getenv("TRENDS_CACHE_STALE_SECONDS", 30 * 24 * 3600))
+TRENDS_CACHE_MAX_MEMORY = int(os.getenv("TRENDS_CACHE_MAX_MEMORY", 1024))
+TRENDS_CACHE_MAX_ROWS = int(os.getenv("TRENDS_CACHE_MAX_ROWS", 10_000))
+
+
+class TrendsCache:
+    """
+    Two-level cache for trend lookups keyed by (keyword, geo, timeframe).
+
+    - Memory: bounded LRU, so a pair is fetched at most once per run
+    - SQLite: `trends_cache` table, so a pair is fetched at most once per TTL
+
+    Rows past the TTL stay in the table for `stale_seconds` and are only
+    served through get_stale().
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = TRENDS_CACHE_TTL_SECONDS,
+        max_memory: int = TRENDS_CACHE_MAX_MEMORY,
+        max_rows: int = TRENDS_CACHE_MAX_ROWS,
+        stale_seconds: int = TRENDS_CACHE_STALE_SECONDS,
+    ):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.stale_ttl = timedelta(seconds=max(stale_seconds, ttl_seconds))
+        self.max_memory = max_memory
+        self.max_rows = max_rows
+
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._table_ready = False
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    # ---------------------------------------------
+    # INTERNALS
+    # ---------------------------------------------
+
+    def _ensure_table(self):
+        if self._table_ready:
+            return
+        TrendCacheEntry.__table__.create(bind=engine, checkfirst=True)
+        self._table_ready = True
+        self.evict()
+
+    def _remember(self, key: tuple, fetched_at: datetime, value: dict):
+        with self._lock:
+            self._memory[key] = (fetched_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+
+    def _is_fresh(self, fetched_at: datetime) -> bool:
+        return datetime.utcnow() - fetched_at < self.ttl
+
+    # ---------------------------------------------
+    # PUBLIC API
+    # ---------------------------------------------
+
+    def get(self, keyword: str, geo: str, timeframe: str) -> dict | None:
+        key = (keyword, geo, timeframe)
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._is_fresh(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return dict(entry[1])
+                del self._memory[key]
+
+        self._ensure_table()
+        db = SessionLocal()
+        try:
+            row = db.get(TrendCacheEntry, key)
+            if row is not None and self._is_fresh(row.fetched_at):
+                value = json.loads(row.payload)
+                self._remember(key, row.fetched_at, value)
+                self.db_hits += 1
+                return dict(value)
+        finally:
+            db.close()
+
+        self.misses += 1
+        return None
+
+    def get_stale(self, keyword: str, geo: str, timeframe: str) -> dict | None:
+        """
+        Last stored value regardless of the TTL (within `stale_seconds`).
+        """
+        self._ensure_table()
+        db = SessionLocal()
+        try:
+            row = db.get(TrendCacheEntry, (keyword, geo, timeframe))
+            if row is None or datetime.utcnow() - row.fetched_at >= self.stale_ttl:
+                return None
+            self.stale_hits += 1
+            return json.loads(row.payload)
+        finally:
+            db.close()
+
+    def set(self, keyword: str, geo: str, timeframe: str, value: dict):
+        key = (keyword, geo, timeframe)
+        fetched_at = datetime.utcnow()
+        self._remember(key, fetched_at, dict(value))
+
+        self._ensure_table()
+        db = SessionLocal()
+        try:
+            db.merge(TrendCacheEntry(
+                keyword=keyword,
+                geo=geo,
+                timeframe=timeframe,
+                payload=json.dumps(value),
+                fetched_at=fetched_at,
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def evict(self):
+        """
+        Drop rows past `stale_seconds`, then trim the table to `max_rows`
+        newest entries.
+        """
+        cutoff = datetime.utcnow() - self.stale_ttl
+        db = SessionLocal()
+        try:
+            db.query(TrendCacheEntry).filter(
+                TrendCacheEntry.fetched_at < cutoff
+            ).delete(synchronize_session=False)
+
+            overflow = db.query(TrendCacheEntry).count() - self.max_rows
+            if overflow > 0:
+                oldest = (
+                    db.query(TrendCacheEntry.fetched_at)
+                    .order_by(TrendCacheEntry.fetched_at.asc())
+                    .offset(overflow - 1)
+                    .limit(1)
+                    .scalar()
+                )
+                db.query(TrendCacheEntry).filter(
+                    TrendCacheEntry.fetched_at <= oldest
+                ).delete(synchronize_session=False)
+
+            db.commit()
+        finally:
+            db.close()
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> dict:
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "memory_size": len(self._memory),
+        }
+
+
+trends_cache = TrendsCache()
@@ -4,28 +4,58 @@ Source: YouTube Data API v3
 https://developers.google.com/youtube/v3
 """
 
+import asyncio
+import math
 import os
-import requests
-from dotenv import load_dotenv
-from typing import List, Set
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Tuple
 
+from app import metrics
 from app.database import SessionLocal
-from app.scoring import calculate_pcs, generate_explanation
-from app.crud import upsert_workflow
-from fetcher.google_trends import get_trend_score
+from app.scoring import aggregate_stats, calculate_pcs, generate_explanation
+from app.crud import bulk_upsert_workflows
+from app.jobs import ingestion_lock
+from app.migrations import migrate
+from fetcher import http_client
+from fetcher.google_trends import get_trend_scores
+from fetcher.taxonomy import classify
+from fetcher.youtube_quota import QuotaAccountant
 
 # --------------------------------------------------
 # ENV SETUP
 # --------------------------------------------------
 
-load_dotenv()
-
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 BASE_URL = "https://www.googleapis.com/youtube/v3"
 REQUEST_TIMEOUT = 10
 
-if not YOUTUBE_API_KEY:
-    raise RuntimeError("YOUTUBE_API_KEY not found in environment")
+# videos.list accepts at most 50 IDs per call
+STATS_BATCH_SIZE = 50
+
+# search.list returns at most 50 results per page; further pages are
+# followed with nextPageToken, budget permitting
+SEARCH_PAGE_SIZE = 50
+YOUTUBE_SEARCH_MAX_PAGES = int(os.getenv("YOUTUBE_SEARCH_MAX_PAGES", 5))
+
+# How the videos matching one workflow name are combined: sum | median | top_k
+AGGREGATION = os.getenv("YOUTUBE_AGGREGATION", "median")
+AGGREGATION_TOP_K = int(os.getenv("YOUTUBE_AGGREGATION_TOP_K", 3))
+
+
+@lru_cache(maxsize=None)
+def get_api_key() -> str:
+    """
+    YOUTUBE_API_KEY from the environment / .env, read on first API call
+    so importing this module needs no credentials.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    api_key = os.getenv("YOUTUBE_API_KEY")
+    if not api_key:
+        raise RuntimeError("YOUTUBE_API_KEY not found in environment")
+    return api_key
 
 # --------------------------------------------------
 # SEARCH QUERIES (CRITICAL)
@@ -55,148 +85,443 @@ def normalize_int(value) -> int:
     except (TypeError, ValueError):
         return 0
 
+# --------------------------------------------------
+# YOUTUBE API CALLS
+# --------------------------------------------------
+
+def _search_params(query: str, country: str, max_results: int, page_token: str | None) -> dict:
+    params = {
+        "part": "snippet",
+        "q": query,
+        "type": "video",
+        "maxResults": max_results,
+        "regionCode": country,
+        "key": get_api_key(),
+    }
+    if page_token:
+        params["pageToken"] = page_token
+    return params
 
-def extract_workflow_name(title: str) -> str:
-    title = title.lower()
 
-    keywords = {
-        "google sheets": "Google Sheets",
-        "gmail": "Gmail",
-        "slack": "Slack",
-        "whatsapp": "WhatsApp",
-        "notion": "Notion",
-        "ai": "AI",
+def _stats_params(video_ids: List[str]) -> dict:
+    return {
+        "part": "statistics,snippet",
+        "id": ",".join(video_ids),
+        "key": get_api_key(),
     }
 
-    found = [label for key, label in keywords.items() if key in title]
 
-    if len(found) >= 2:
-        return f"{found[0]} → {found[1]} Automation"
-    elif len(found) == 1:
-        return f"{found[0]} Automation"
-    else:
-        return "General n8n Automation"
+def _video_ids(results: List[dict]) -> List[str]:
+    return [
+        v["id"]["videoId"]
+        for v in results
+        if v.get("id", {}).get("videoId")
+    ]
 
-# --------------------------------------------------
-# YOUTUBE API CALLS
-# --------------------------------------------------
 
-def search_videos(query: str, country: str, max_results: int) -> List[dict]:
-    response = requests.get(
-        f"{BASE_URL}/search",
-        params={
-            "part": "snippet",
-            "q": query,
-            "type": "video",
-            "maxResults": max_results,
-            "regionCode": country,
-            "key": YOUTUBE_API_KEY,
-        },
-        timeout=REQUEST_TIMEOUT,
-    )
-    response.raise_for_status()
-    return response.json().get("items", [])
+def search_videos(
+    query: str,
+    country: str,
+    max_results: int,
+    page_token: str | None = None,
+) -> Tuple[List[dict], bool, str | None, dict | None]:
+    """
+    One result page. Returns (items, not_modified, next_page_token, receipt).
+    """
+    with metrics.INGEST_STAGE_SECONDS.time(source="youtube", country=country, stage="search"):
+        payload, not_modified, receipt = http_client.get_json(
+            f"{BASE_URL}/search",
+            params=_search_params(query, country, max_results, page_token),
+            timeout=REQUEST_TIMEOUT,
+        )
+    return payload.get("items", []), not_modified, payload.get("nextPageToken"), receipt
 
 
-def get_video_stats(video_ids: List[str]) -> List[dict]:
+def get_video_stats(video_ids: List[str]) -> Tuple[List[dict], bool, dict | None]:
+    """
+    Returns (items, not_modified, receipt).
+    """
     if not video_ids:
-        return []
-
-    response = requests.get(
-        f"{BASE_URL}/videos",
-        params={
-            "part": "statistics,snippet",
-            "id": ",".join(video_ids),
-            "key": YOUTUBE_API_KEY,
-        },
-        timeout=REQUEST_TIMEOUT,
-    )
-    response.raise_for_status()
-    return response.json().get("items", [])
+        return [], True, None
+
+    # Video IDs are shared by every country
+    with metrics.INGEST_STAGE_SECONDS.time(source="youtube", country="all", stage="video_stats"):
+        payload, not_modified, receipt = http_client.get_json(
+            f"{BASE_URL}/videos",
+            params=_stats_params(video_ids),
+            timeout=REQUEST_TIMEOUT,
+        )
+    return payload.get("items", []), not_modified, receipt
+
+
+async def search_videos_async(
+    client,
+    query: str,
+    country: str,
+    max_results: int,
+    page_token: str | None = None,
+) -> Tuple[List[dict], bool, str | None, dict | None]:
+    """
+    search_videos over an http_client.async_client().
+    """
+    with metrics.INGEST_STAGE_SECONDS.time(source="youtube", country=country, stage="search"):
+        payload, not_modified, receipt = await http_client.async_get_json(
+            client,
+            f"{BASE_URL}/search",
+            params=_search_params(query, country, max_results, page_token),
+            timeout=REQUEST_TIMEOUT,
+        )
+    return payload.get("items", []), not_modified, payload.get("nextPageToken"), receipt
+
+
+async def get_video_stats_async(client, video_ids: List[str]) -> Tuple[List[dict], bool, dict | None]:
+    """
+    get_video_stats over an http_client.async_client().
+    """
+    if not video_ids:
+        return [], True, None
+
+    with metrics.INGEST_STAGE_SECONDS.time(source="youtube", country="all", stage="video_stats"):
+        payload, not_modified, receipt = await http_client.async_get_json(
+            client,
+            f"{BASE_URL}/videos",
+            params=_stats_params(video_ids),
+            timeout=REQUEST_TIMEOUT,
+        )
+    return payload.get("items", []), not_modified, receipt
 
 # --------------------------------------------------
 # INGESTION PIPELINE
 # --------------------------------------------------
 
-def ingest_youtube_workflows(country: str = "US", max_results: int = 15):
+def _search_pages(max_results: int) -> List[int]:
     """
-    Multi-query YouTube ingestion with deduplication
+    Page sizes covering `max_results` per search, at most
+    YOUTUBE_SEARCH_MAX_PAGES pages.
     """
-    db = SessionLocal()
-    seen_workflows: Set[str] = set()
+    pages = min(math.ceil(max_results / SEARCH_PAGE_SIZE), YOUTUBE_SEARCH_MAX_PAGES)
+    return [
+        min(SEARCH_PAGE_SIZE, max_results - page * SEARCH_PAGE_SIZE)
+        for page in range(pages)
+    ]
 
-    try:
-        for query in SEARCH_QUERIES:
-            videos = search_videos(query, country, max_results)
 
-            video_ids = [
-                v["id"]["videoId"]
-                for v in videos
-                if v.get("id", {}).get("videoId")
-            ]
+def _reached_api(error: Exception) -> bool:
+    # HTTP errors carry the response; connection / config errors do not
+    return getattr(error, "response", None) is not None
+
+
+# Result of a charged call that was never made
+NOT_SENT = object()
+
+
+def _settle(quota: QuotaAccountant, endpoint: str, results: list, reserve: tuple = ()) -> list:
+    """
+    Release the units of calls in `results` that were never sent or
+    failed without reaching the API, then raise the first failure, if any.
+    """
+    failed = [r for r in results if isinstance(r, BaseException)]
+    for result in results:
+        if result is NOT_SENT or (isinstance(result, BaseException) and not _reached_api(result)):
+            quota.release(endpoint, reserve)
+    if failed:
+        raise failed[0]
+    return results
+
+
+def _call_each(calls: list) -> list:
+    """
+    Run `calls` in order, stopping at the first failure: its exception
+    is returned in its place and the calls never made as NOT_SENT.
+    """
+    results = []
+    for call in calls:
+        try:
+            results.append(call())
+        except Exception as e:
+            results.append(e)
+            return results + [NOT_SENT] * (len(calls) - len(results))
+    return results
+
+
+def _take_pages(pending: list, quota: QuotaAccountant) -> list:
+    """
+    The (key, page_token) searches the budget pays for, best yield first.
+    Each page also reserves the videos.list unit its IDs may need.
+    """
+    return [
+        (key, token)
+        for key, token in sorted(pending, key=lambda p: quota.priority(p[0]), reverse=True)
+        if quota.try_charge("search", reserve=("videos",))
+    ]
+
+
+def _add_search_pages(search_results: dict, taken: list, pages: list, quota: QuotaAccountant) -> list:
+    """
+    Merge one round of result pages into {(query, country): (items,
+    not_modified, receipts)}; returns the (key, next_page_token) still
+    pending.
+    """
+    pending = []
+    for (key, _), (items, not_modified, next_token, receipt) in zip(taken, pages):
+        quota.record_search(key, _video_ids(items))
+
+        previous_items, previous_unchanged, receipts = search_results.get(key, ([], True, []))
+        search_results[key] = (
+            previous_items + items,
+            previous_unchanged and not_modified,
+            receipts + [receipt],
+        )
+
+        if next_token:
+            pending.append((key, next_token))
+    return pending
+
 
-            stats = get_video_stats(video_ids)
+def _stats_batches(search_results: dict) -> List[List[str]]:
+    """
+    Distinct video IDs across every (query, country) search, in first
+    seen order, split into videos.list-sized batches.
+    """
+    video_ids = list(dict.fromkeys(
+        video_id
+        for items, _, _ in search_results.values()
+        for video_id in _video_ids(items)
+    ))
+    return [
+        video_ids[i:i + STATS_BATCH_SIZE]
+        for i in range(0, len(video_ids), STATS_BATCH_SIZE)
+    ]
+
+
+def _videos_by_country(
+    countries: List[str],
+    search_results: dict,
+    batches: List[List[str]],
+    stats: list,
+) -> dict:
+    """
+    {country: (videos, unchanged, receipts)} from search results and
+    per-batch (items, not_modified, receipt) stats. Each country gets
+    every video its searches returned, once; unchanged is True when all
+    of its searches and the stats batches holding its videos answered
+    304 for already ingested data. `receipts` are the responses to mark
+    ingested once the country's rows are committed.
+    """
+    videos_by_id = {}
+    batch_by_id = {}
+    for index, (batch, (items, _, _)) in enumerate(zip(batches, stats)):
+        videos_by_id.update((v["id"], v) for v in items)
+        batch_by_id.update((video_id, index) for video_id in batch)
+
+    # Countries whose searches were all over budget get no videos
+    country_ids: Dict[str, dict] = {country: {} for country in countries}
+    searches_unchanged: Dict[str, bool] = dict.fromkeys(countries, True)
+    search_receipts: Dict[str, list] = {country: [] for country in countries}
+    for (_, country), (items, not_modified, receipts) in search_results.items():
+        country_ids.setdefault(country, {}).update(dict.fromkeys(_video_ids(items)))
+        searches_unchanged[country] = searches_unchanged[country] and not_modified
+        search_receipts[country] += receipts
+
+    result = {}
+    for country, video_ids in country_ids.items():
+        used = [stats[i] for i in dict.fromkeys(batch_by_id[v] for v in video_ids)]
+        result[country] = (
+            [videos_by_id[i] for i in video_ids if i in videos_by_id],
+            searches_unchanged[country] and all(not_modified for _, not_modified, _ in used),
+            search_receipts[country] + [receipt for _, _, receipt in used],
+        )
+    return result
+
+
+def fetch_videos(
+    countries: List[str],
+    max_results: int,
+    quota: QuotaAccountant | None = None,
+) -> dict:
+    """
+    Search every SEARCH_QUERIES x country for up to `max_results` videos
+    each, following nextPageToken while `quota` allows, then fetch
+    statistics once per distinct video ID (batches of STATS_BATCH_SIZE).
+
+    Returns {country: (videos, unchanged, receipts)}.
+    """
+    quota = quota or QuotaAccountant()
+    search_results = {}
+    pending = [((query, country), None) for country in countries for query in SEARCH_QUERIES]
+
+    for page_size in _search_pages(max_results):
+        taken = _take_pages(pending, quota)
+        pages = _call_each([
+            lambda query=query, country=country, token=token: search_videos(
+                query, country, page_size, token
+            )
+            for (query, country), token in taken
+        ])
+        _settle(quota, "search", pages, reserve=("videos",))
+        pending = _add_search_pages(search_results, taken, pages, quota)
+
+    batches = _stats_batches(search_results)
+    for _ in batches:
+        quota.charge("videos")
+    stats = _call_each([lambda batch=batch: get_video_stats(batch) for batch in batches])
+    _settle(quota, "videos", stats)
+    return _videos_by_country(countries, search_results, batches, stats)
+
+
+async def fetch_videos_async(
+    client,
+    countries: List[str],
+    max_results: int,
+    quota: QuotaAccountant | None = None,
+) -> dict:
+    """
+    fetch_videos over an http_client.async_client(); each round of
+    search pages and the stats batches run concurrently.
+    """
+    quota = quota or QuotaAccountant()
+    search_results = {}
+    pending = [((query, country), None) for country in countries for query in SEARCH_QUERIES]
+
+    for page_size in _search_pages(max_results):
+        taken = _take_pages(pending, quota)
+        pages = await asyncio.gather(*(
+            search_videos_async(client, query, country, page_size, token)
+            for (query, country), token in taken
+        ), return_exceptions=True)
+        _settle(quota, "search", pages, reserve=("videos",))
+        pending = _add_search_pages(search_results, taken, pages, quota)
+
+    batches = _stats_batches(search_results)
+    for _ in batches:
+        quota.charge("videos")
+    stats = await asyncio.gather(*(
+        get_video_stats_async(client, batch) for batch in batches
+    ), return_exceptions=True)
+    _settle(quota, "videos", stats)
+    return _videos_by_country(countries, search_results, batches, stats)
+
+
+def build_youtube_workflows(videos: List[dict], country: str) -> List[dict]:
+    """
+    Turn video statistics into scored workflow rows.
+    Every video mapping to a workflow name contributes, combined with
+    aggregate_stats, so results do not depend on search order.
+    """
+    stats_by_workflow: Dict[str, List[tuple]] = {}
+    names = classify([video["snippet"]["title"] for video in videos], suffix="Automation")
 
-            for video in stats:
-                title = video["snippet"]["title"]
-                s = video.get("statistics", {})
+    for video, workflow_name in zip(videos, names):
+        s = video.get("statistics", {})
 
-                views = normalize_int(s.get("viewCount"))
-                likes = normalize_int(s.get("likeCount"))
-                comments = normalize_int(s.get("commentCount"))
+        stats_by_workflow.setdefault(workflow_name, []).append((
+            normalize_int(s.get("viewCount")),
+            normalize_int(s.get("likeCount")),
+            normalize_int(s.get("commentCount")),
+        ))
 
-                workflow_name = extract_workflow_name(title)
+    rows: List[dict] = []
 
-                # 🔒 Deduplication (CRITICAL)
-                if workflow_name in seen_workflows:
-                    continue
-                seen_workflows.add(workflow_name)
+    # 🔥 Google Trends (batched, one lookup per distinct workflow name)
+    with metrics.INGEST_STAGE_SECONDS.time(source="youtube", country=country, stage="trends"):
+        trends = get_trend_scores(list(stats_by_workflow), country)
 
-                # 🔥 Google Trends
-                trend = get_trend_score(workflow_name, country)
+    scoring_start = time.perf_counter()
 
-                # 🔢 PCS Scoring
-                scores = calculate_pcs(
-                    views=views,
-                    likes=likes,
-                    comments=comments,
-                    keyword=workflow_name,
-                    country=country,
-                )
+    for workflow_name, stats in stats_by_workflow.items():
+        views, likes, comments = aggregate_stats(stats, AGGREGATION, AGGREGATION_TOP_K)
 
-                explanation = generate_explanation(
-                    views=views,
-                    likes=likes,
-                    comments=comments,
-                    trend_direction=trend["trend_direction"],
-                )
+        trend = trends[workflow_name]
 
-                workflow_data = {
-                    "name": workflow_name,
-                    "platform": "YouTube",
-                    "country": country,
+        # 🔢 PCS Scoring
+        scores = calculate_pcs(
+            views=views,
+            likes=likes,
+            comments=comments,
+            keyword=workflow_name,
+            country=country,
+            trend_data=trend,
+        )
 
-                    "views": views,
-                    "likes": likes,
-                    "comments": comments,
+        explanation = generate_explanation(
+            views=views,
+            likes=likes,
+            comments=comments,
+            trend_direction=trend["trend_direction"],
+        )
 
-                    "like_to_view_ratio": (likes / views) if views else 0,
-                    "comment_to_view_ratio": (comments / views) if views else 0,
+        workflow_data = {
+            "name": workflow_name,
+            "platform": "YouTube",
+            "country": country,
 
-                    "popularity_score": scores["popularity_score"],
-                    "engagement_score": scores["engagement_score"],
-                    "volume_score": scores["volume_score"],
-                    "trend_score": scores["trend_score"],
+            "views": views,
+            "likes": likes,
+            "comments": comments,
 
-                    # ✅ Evidence fields
-                    "trend_direction": trend["trend_direction"],
-                    "trend_avg_interest": trend["avg_interest"],
+            "like_to_view_ratio": (likes / views) if views else 0,
+            "comment_to_view_ratio": (comments / views) if views else 0,
 
-                    "explanation": explanation,
-                }
+            "popularity_score": scores["popularity_score"],
+            "engagement_score": scores["engagement_score"],
+            "volume_score": scores["volume_score"],
+            "trend_score": scores["trend_score"],
 
-                upsert_workflow(db, workflow_data)
+            # ✅ Evidence fields
+            "trend_direction": trend["trend_direction"],
+            "trend_avg_interest": trend["avg_interest"],
+            "trend_freshness": trend["trend_freshness"],
+
+            "explanation": explanation,
+        }
+
+        rows.append(workflow_data)
+
+    metrics.INGEST_STAGE_SECONDS.observe(
+        time.perf_counter() - scoring_start, source="youtube", country=country, stage="scoring"
+    )
+    return rows
+
+
+def ingest_youtube_videos(db, fetched: tuple, country: str, run_ts: datetime | None = None) -> int:
+    """
+    Score and write one country's (videos, unchanged, receipts) from
+    fetch_videos. Returns the number of workflows written.
+
+    The responses are marked ingested only after the commit, and only
+    when every row got fresh Trends data, so failed or degraded runs
+    are redone instead of being skipped as 304s next time.
+    """
+    videos, unchanged, receipts = fetched
+
+    # Every search and stats call answered 304 for ingested data
+    if unchanged:
+        return 0
+
+    rows = build_youtube_workflows(videos, country)
+
+    with metrics.INGEST_STAGE_SECONDS.time(source="youtube", country=country, stage="db_write"):
+        written = bulk_upsert_workflows(db, rows, run_ts=run_ts)
+
+    if all(row["trend_freshness"] == "fresh" for row in rows):
+        http_client.mark_ingested(receipts)
+    return written
+
+
+def ingest_youtube_workflows(country: str = "US", max_results: int = 15):
+    """
+    Multi-query YouTube ingestion with video-level deduplication.
+    Skips scoring and writes when every response was 304 Not Modified.
+    """
+    db = SessionLocal()
+    try:
+        quota = QuotaAccountant.load(db)
+        try:
+            fetched = fetch_videos([country], max_results, quota)[country]
+        finally:
+            quota.save(db)
 
+        ingest_youtube_videos(db, fetched, country)
     finally:
         db.close()
 
@@ -205,6 +530,11 @@ def ingest_youtube_workflows(country: str = "US", max_results: int = 15):
 # --------------------------------------------------
 
 if __name__ == "__main__":
-    ingest_youtube_workflows(country="US", max_results=15)
-    ingest_youtube_workflows(country="IN", max_results=15)
-    print("YouTube workflows ingested successfully.")
+    # Never alongside a scheduled run or /ingest
+    with ingestion_lock():
+        # Existing databases need the upsert conflict index / new columns
+        migrate()
+
+        ingest_youtube_workflows(country="US", max_results=15)
+        ingest_youtube_workflows(country="IN", max_results=15)
+        print("YouTube workflows ingested successfully.")
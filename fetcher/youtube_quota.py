@@ -0,0 +1,194 @@
+"""
+YouTube Data API quota accounting
+https://developers.google.com/youtube/v3/determine_quota_cost
+
+Every search / videos call is charged its documented unit cost against
+a per-run budget and the daily quota (reset at midnight Pacific time).
+Calls that never got a response from the API are released again, so
+only requests YouTube actually received are persisted.
+Daily usage and the number of new video IDs each (query, country)
+search found are persisted, so later runs spend extra result pages on
+the queries that found the most new videos last time.
+"""
+
+import math
+import os
+import threading
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from app import metrics
+from app.crud import (
+    add_api_quota_usage,
+    get_api_quota_usage,
+    get_youtube_query_yields,
+    mark_youtube_videos_seen,
+    upsert_youtube_query_yields,
+)
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+
+# Units per call
+UNIT_COSTS = {"search": 100, "videos": 1}
+
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", 10_000))
+# At most this much of the daily quota is spent by one run
+YOUTUBE_RUN_QUOTA = int(os.getenv("YOUTUBE_RUN_QUOTA", 3_000))
+
+# A video counts as new when no search returned it for this many days
+YOUTUBE_SEEN_RETENTION_DAYS = int(os.getenv("YOUTUBE_SEEN_RETENTION_DAYS", 30))
+
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+def quota_day(now: datetime | None = None) -> date:
+    """
+    Current YouTube quota day (midnight-to-midnight Pacific time).
+    """
+    return (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE).date()
+
+
+class QuotaAccountant:
+    """
+    Budget for one ingestion run.
+
+    Search pages are taken with try_charge("search", reserve=("videos",)):
+    a page holds at most one videos.list batch worth of new IDs, so the
+    reservation guarantees the statistics calls fit in the budget too.
+    A charged call that fails before reaching the API is given back with
+    release().
+    """
+
+    def __init__(
+        self,
+        used_today: int = 0,
+        yields: dict | None = None,
+        daily_quota: int = YOUTUBE_DAILY_QUOTA,
+        run_quota: int = YOUTUBE_RUN_QUOTA,
+        day: date | None = None,
+    ):
+        self.day = day or quota_day()
+        self.used_today = used_today
+        self.budget = max(min(run_quota, daily_quota - used_today), 0)
+        # (query, country) -> (pages, new_video_ids) from the last run
+        self.yields = yields or {}
+
+        self.spent = 0
+        self.reserved = 0
+        self.calls = {endpoint: 0 for endpoint in UNIT_COSTS}
+        self.skipped_pages = 0
+        # (query, country) -> [pages, video IDs in first seen order]
+        self.searches: dict = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, db, **kwargs) -> "QuotaAccountant":
+        day = kwargs.pop("day", None) or quota_day()
+        return cls(
+            used_today=get_api_quota_usage(db, "youtube", day),
+            yields=get_youtube_query_yields(db),
+            day=day,
+            **kwargs,
+        )
+
+    # ---------------------------------------------
+    # CHARGING
+    # ---------------------------------------------
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - self.spent - self.reserved
+
+    def try_charge(self, endpoint: str, reserve: tuple = ()) -> bool:
+        """
+        Charge one `endpoint` call and hold units for the `reserve`
+        calls it will lead to. False (nothing charged) when over budget.
+        """
+        cost = UNIT_COSTS[endpoint]
+        held = sum(UNIT_COSTS[e] for e in reserve)
+
+        with self._lock:
+            if cost + held > self.remaining:
+                if endpoint == "search":
+                    self.skipped_pages += 1
+                return False
+            self.spent += cost
+            self.reserved += held
+            self.calls[endpoint] += 1
+        return True
+
+    def charge(self, endpoint: str):
+        """
+        Charge a call that must happen, drawing on reserved units first.
+        """
+        cost = UNIT_COSTS[endpoint]
+        with self._lock:
+            self.reserved = max(self.reserved - cost, 0)
+            self.spent += cost
+            self.calls[endpoint] += 1
+
+    def release(self, endpoint: str, reserve: tuple = ()):
+        """
+        Undo try_charge / charge for a call the API never received.
+        """
+        with self._lock:
+            self.spent -= UNIT_COSTS[endpoint]
+            self.reserved = max(self.reserved - sum(UNIT_COSTS[e] for e in reserve), 0)
+            self.calls[endpoint] -= 1
+
+    # ---------------------------------------------
+    # SEARCH YIELD
+    # ---------------------------------------------
+
+    def priority(self, key: tuple) -> float:
+        """
+        New video IDs per page last run; never-run searches come first.
+        """
+        pages, new_ids = self.yields.get(key, (0, 0))
+        return new_ids / pages if pages else math.inf
+
+    def record_search(self, key: tuple, video_ids: list):
+        with self._lock:
+            entry = self.searches.setdefault(key, [0, {}])
+            entry[0] += 1
+            entry[1].update(dict.fromkeys(video_ids))
+
+    def save(self, db, run_ts: datetime | None = None):
+        """
+        Persist the units spent and each search's yield.
+        """
+        run_ts = run_ts or datetime.utcnow()
+
+        if self.spent:
+            add_api_quota_usage(db, "youtube", self.day, self.spent)
+        for endpoint, calls in self.calls.items():
+            if calls:
+                metrics.YOUTUBE_QUOTA_UNITS.inc(calls * UNIT_COSTS[endpoint], endpoint=endpoint)
+
+        all_ids = [i for _, ids in self.searches.values() for i in ids]
+        new_ids = mark_youtube_videos_seen(db, all_ids, run_ts, YOUTUBE_SEEN_RETENTION_DAYS)
+
+        upsert_youtube_query_yields(db, [
+            {
+                "query": query,
+                "country": country,
+                "pages": pages,
+                "video_ids": len(ids),
+                "new_video_ids": sum(1 for i in ids if i in new_ids),
+                "run_ts": run_ts,
+            }
+            for (query, country), (pages, ids) in self.searches.items()
+        ])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "day": self.day.isoformat(),
+                "budget": self.budget,
+                "spent": self.spent,
+                "used_today": self.used_today + self.spent,
+                "calls": dict(self.calls),
+                "skipped_pages": self.skipped_pages,
+            }
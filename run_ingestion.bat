@@ -1,8 +1,6 @@
 @echo off
 cd C:\Users\Kirus\Documents\workflow_pop
 
-python -m fetcher.youtube_fetcher
-python -m fetcher.forum_fetcher
+python -m scripts.run_ingestion
 
 echo Ingestion completed at %DATE% %TIME% >> ingestion.log
->>>>>>> 292aa42 (Update ingestion logic)
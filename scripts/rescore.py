@@ -0,0 +1,97 @@
+"""
+Offline rescoring
+Recomputes popularity scores for the whole table from stored raw
+counts and trend evidence. No YouTube / Discourse / Trends calls.
+"""
+
+from app.database import SessionLocal
+from app.crud import iter_workflow_chunks, bulk_update_workflows
+from app.jobs import ingestion_lock
+from app.migrations import migrate
+from app.models import Workflow
+from app.scoring import EXPLANATIONS, score_batch, trend_scores_from_stored
+
+RESCORE_CHUNK_SIZE = 5_000
+
+SCORE_COLUMNS = [
+    "popularity_score",
+    "engagement_score",
+    "volume_score",
+    "trend_score",
+    "like_to_view_ratio",
+    "comment_to_view_ratio",
+]
+
+
+def rescore_workflows(chunk_size: int = RESCORE_CHUNK_SIZE, progress=None) -> int:
+    """
+    Stream `workflows` in id-ordered chunks, rescore each chunk with
+    score_batch and write it back. Returns the number of rows rescored.
+
+    Holds ingestion_lock() throughout, so no ingestion commits new
+    counts between a chunk being read and its scores being written.
+    `progress("rescore", **fields)` is called as chunks are written.
+    """
+    with ingestion_lock():
+        return _rescore_workflows(chunk_size, progress)
+
+
+def _rescore_workflows(chunk_size: int, progress) -> int:
+    migrate()
+
+    db = SessionLocal()
+    total = 0
+
+    if progress is not None:
+        progress("rescore", status="running", items=0)
+
+    try:
+        chunks = iter_workflow_chunks(
+            db,
+            [
+                Workflow.views,
+                Workflow.likes,
+                Workflow.comments,
+                Workflow.trend_direction,
+                Workflow.trend_freshness,
+            ],
+            chunk_size=chunk_size,
+        )
+
+        for rows in chunks:
+            ids, views, likes, comments, directions, freshness = zip(*rows)
+
+            scores = score_batch(
+                views=[v or 0 for v in views],
+                likes=[v or 0 for v in likes],
+                comments=[v or 0 for v in comments],
+                trend_scores=trend_scores_from_stored(directions, freshness),
+                trend_directions=directions,
+            )
+
+            columns = [scores[name].tolist() for name in SCORE_COLUMNS]
+            codes = scores["explanation_code"].tolist()
+
+            updates = [
+                {
+                    "id": row_id,
+                    **dict(zip(SCORE_COLUMNS, values)),
+                    "explanation": EXPLANATIONS[code],
+                }
+                for row_id, code, *values in zip(ids, codes, *columns)
+            ]
+
+            total += bulk_update_workflows(db, updates)
+            if progress is not None:
+                progress("rescore", items=total)
+    finally:
+        db.close()
+
+    if progress is not None:
+        progress("rescore", status="done")
+    return total
+
+
+if __name__ == "__main__":
+    count = rescore_workflows()
+    print(f"Rescored {count} workflows.")
@@ -1,23 +1,198 @@
 """
 Unified ingestion runner
 Used for cron / scheduled execution
+
+Network calls run concurrently on an asyncio event loop in a
+background thread; scoring and all database writes stay on the
+calling thread, which owns the only session.
 """
 
-from fetcher.youtube_fetcher import ingest_youtube_workflows
-from fetcher.forum_fetcher import ingest_forum_workflows
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from contextlib import contextmanager
 
-def run_all_ingestions():
-    # YouTube
-    ingest_youtube_workflows(country="US", max_results=30)
-    ingest_youtube_workflows(country="IN", max_results=30)
+from app import metrics
+from app.database import SessionLocal
+from app.jobs import ingestion_lock
+from app.crud import compact_snapshots, get_forum_watermark
+from app.migrations import migrate
+from fetcher.youtube_fetcher import fetch_videos_async, ingest_youtube_videos
+from fetcher.forum_fetcher import fetch_latest_topics_async, ingest_forum_topics
+from fetcher import http_client
+from fetcher.trends_cache import trends_cache
+from fetcher.youtube_quota import QuotaAccountant
 
-    # Forum
-    ingest_forum_workflows(country="US", limit=50)
-    ingest_forum_workflows(country="IN", limit=50)
+COUNTRIES = ["US", "IN"]
+# Per (query, country), 50 per page; pages past the first go to the
+# best-yielding queries while the quota budget lasts
+YOUTUBE_MAX_RESULTS = 100
+FORUM_LIMIT = 50
 
+# Max in-flight HTTP requests across all sources
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 8))
 
-    print("Ingestion completed successfully.")
+# Runs also execute on API worker threads (/ingest): report through
+# logging, never stdout
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def background_loop():
+    """
+    Event loop running on a daemon thread. Yields `submit(coro)`, which
+    schedules a coroutine on it and returns a concurrent.futures.Future.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="ingest-fetch", daemon=True)
+    thread.start()
+
+    async def cancel_pending():
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    try:
+        yield lambda coro: asyncio.run_coroutine_threadsafe(coro, loop)
+    finally:
+        # Fetches left over when a step raised are abandoned
+        asyncio.run_coroutine_threadsafe(cancel_pending(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def ingestion_sources() -> list:
+    return [f"youtube:{c}" for c in COUNTRIES] + [f"forum:{c}" for c in COUNTRIES]
+
+
+def _run_source(report, source: str, step):
+    """
+    Run one source's scoring + write step, reporting progress.
+    Errors are recorded instead of aborting the other sources.
+    """
+    report(source, status="running")
+    start = time.perf_counter()
+
+    name = source.split(":", 1)[0]
+
+    try:
+        items = step()
+    except Exception as e:
+        metrics.INGEST_SOURCE_RUNS.inc(source=name, status="failed")
+        report(source, status="failed", error=str(e), seconds=round(time.perf_counter() - start, 3))
+        return
+
+    metrics.INGEST_SOURCE_RUNS.inc(source=name, status="done")
+    report(source, status="done", items=items, seconds=round(time.perf_counter() - start, 3))
+
+
+def run_all_ingestions(max_workers: int = INGEST_CONCURRENCY, progress=None) -> dict:
+    """
+    Ingest every source for every country.
+
+    `progress(source, **fields)` is called as each source ("youtube:US",
+    "forum:IN", ...) changes state. Returns the per-source summary;
+    raises RuntimeError once all sources ran if any of them failed.
+    """
+    summary = {}
+
+    def report(source, **fields):
+        summary.setdefault(source, {}).update(fields)
+        if progress is not None:
+            progress(source, **fields)
+
+    for source in ingestion_sources():
+        report(source, status="queued")
+
+    with ingestion_lock():
+        # Existing databases need the upsert conflict index
+        migrate()
+
+        # Single writer: this session is only used from the calling thread
+        db = SessionLocal()
+
+        # Shared timestamp for every snapshot written by this run
+        run_ts = datetime.utcnow()
+
+        try:
+            # Forum pages are shared by all countries, so paginate back to
+            # the oldest per-country watermark
+            watermarks = [get_forum_watermark(db, country) for country in COUNTRIES]
+            since = None if None in watermarks else min(watermarks)
+
+            # Daily usage so far and last run's per-query yield
+            quota = QuotaAccountant.load(db)
+
+            with background_loop() as submit:
+                # At most `max_workers` requests in flight
+                client = http_client.async_client(max_connections=max_workers)
+
+                # YouTube: every (query, country) search, further result
+                # pages as the quota allows, then statistics once per
+                # distinct video ID
+                youtube = submit(
+                    fetch_videos_async(client, COUNTRIES, YOUTUBE_MAX_RESULTS, quota)
+                )
+
+                # Forum: /latest.json is not region specific, fetch it once
+                forum = submit(fetch_latest_topics_async(client, limit=FORUM_LIMIT, since=since))
+
+                # Consume results in submission order
+                for country in COUNTRIES:
+                    _run_source(
+                        report,
+                        f"youtube:{country}",
+                        lambda country=country: ingest_youtube_videos(
+                            db, youtube.result()[country], country, run_ts=run_ts
+                        ),
+                    )
+
+                # The forum pages are shared: they count as ingested only
+                # once every country scored all of its topics
+                forum_complete = []
+                for country in COUNTRIES:
+                    def forum_step(country=country):
+                        topics, _ = forum.result()
+                        rescored, complete = ingest_forum_topics(db, topics, country, run_ts=run_ts)
+                        forum_complete.append(complete)
+                        return rescored
+
+                    _run_source(report, f"forum:{country}", forum_step)
+
+                if len(forum_complete) == len(COUNTRIES) and all(forum_complete):
+                    http_client.mark_ingested(forum.result()[1])
+
+                # Pooled connections belong to this loop, close them on it
+                submit(client.aclose()).result()
+
+            # Units are spent even when a YouTube step failed
+            quota.save(db, run_ts=run_ts)
+
+            # History retention: raw -> daily downsampling, expiry
+            compact_snapshots(db)
+
+            # Responses no query has revalidated for a while
+            http_client.prune_cache()
+        finally:
+            db.close()
+
+    logger.info("Trends cache: %s", trends_cache.stats())
+    logger.info("HTTP: %s", http_client.stats())
+    logger.info("YouTube quota: %s", quota.stats())
+
+    failed = [source for source, state in summary.items() if state["status"] == "failed"]
+    if failed:
+        raise RuntimeError(f"Ingestion failed for: {', '.join(failed)}")
+
+    return summary
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     run_all_ingestions()
+    print("Ingestion completed successfully.")
@@ -0,0 +1,35 @@
+"""
+Shared fixtures
+app.database reads DATABASE_URL at import time, so the scratch database
+(HTTP cache, ingestion lock) is configured here, before any app module is imported.
+"""
+
+import os
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="n8n-popularity-tests-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ.pop("ASYNC_DATABASE_READ_URL", None)
+os.environ["HTTP_CACHE_DIR"] = os.path.join(WORKDIR, "http_cache")
+os.environ["INGEST_LOCK_PATH"] = os.path.join(WORKDIR, "ingestion.lock")
+
+import pytest  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """
+    Session on a freshly migrated SQLite database, dropped afterwards.
+    """
+    migrate()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
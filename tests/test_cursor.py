@@ -0,0 +1,52 @@
+import base64
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.main import decode_cursor, encode_cursor
+
+
+def _raw_cursor(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+@pytest.fixture
+def client(db):
+    main._leaderboard_cache.clear()
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_round_trip():
+    after = (2**63 - 1, -(2**63))
+    assert decode_cursor(encode_cursor(after)) == after
+
+
+@pytest.mark.parametrize("text", [
+    "[1e999,1]",
+    "[1,-1e999]",
+    "[NaN,1]",
+    f"[{10**26},1]",
+    f"[1,{-(2**63) - 1}]",
+    "[1]",
+    "[1,2,3]",
+    '{"a":1}',
+    "null",
+    '["x",1]',
+    "not json",
+])
+def test_bad_cursors_are_rejected_with_400(client, text):
+    response = client.get("/workflows", params={"cursor": _raw_cursor(text)})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_garbage_cursor_is_rejected_with_400(client):
+    assert client.get("/workflows", params={"cursor": "%%%"}).status_code == 400
+
+
+@pytest.mark.parametrize("text", ['["2026-03-01T00:00:00",1e999]', '["yesterday",1]', "[1,2]"])
+def test_bad_history_cursors_are_rejected_with_400(client, text):
+    response = client.get("/workflows/A/history", params={"cursor": _raw_cursor(text)})
+    assert response.status_code == 400
@@ -0,0 +1,84 @@
+import pytest
+
+from app.crud import get_forum_workflow_topics
+from app.models import Workflow
+from fetcher import forum_fetcher
+from fetcher.google_trends import DEFAULT_TREND
+
+
+def _topic(topic_id, title, views, likes=0, posts=1, posters=1):
+    return {
+        "id": topic_id,
+        "title": title,
+        "views": views,
+        "like_count": likes,
+        "posts_count": posts,
+        "posters": [{}] * posters,
+        "bumped_at": f"2026-01-0{topic_id}T00:00:00Z",
+    }
+
+
+@pytest.fixture
+def trends(monkeypatch):
+    """
+    Fresh Trends data for every name except those in `trends.failing`.
+    """
+    class Trends:
+        failing = set()
+
+        @classmethod
+        def lookup(cls, names, country):
+            return {
+                name: {
+                    **DEFAULT_TREND,
+                    "trend_freshness": "default" if name in cls.failing else "fresh",
+                }
+                for name in names
+            }
+
+    monkeypatch.setattr(forum_fetcher, "get_trend_scores", Trends.lookup)
+    return Trends
+
+
+def _forum_row(db, name):
+    db.expire_all()
+    return db.query(Workflow).filter_by(name=name, platform="Forum", country="US").one()
+
+
+def test_workflow_row_aggregates_all_of_its_topics(db, trends):
+    first = _topic(1, "Slack alert for new leads", views=100, likes=4, posts=3)
+    second = _topic(2, "Slack message on form submit", views=50, likes=1, posts=2, posters=2)
+    forum_fetcher.ingest_forum_topics(db, [first, second], "US")
+
+    row = _forum_row(db, "Slack Workflow")
+    assert (row.views, row.likes, row.replies, row.contributors) == (150, 5, 3, 3)
+
+    # Only the second topic changed, and only it is on the page: the
+    # first still counts through its stored state
+    second = {**second, "views": 70}
+    rescored, complete = forum_fetcher.ingest_forum_topics(db, [second], "US")
+
+    assert (rescored, complete) == (1, True)
+    row = _forum_row(db, "Slack Workflow")
+    assert (row.views, row.likes, row.replies, row.contributors) == (170, 5, 3, 3)
+
+    # Unchanged topics are not rescored
+    assert forum_fetcher.ingest_forum_topics(db, [first, second], "US") == (0, True)
+
+
+def test_topics_without_fresh_trends_are_not_recorded(db, trends):
+    trends.failing = {"Slack Workflow"}
+    topics = [
+        _topic(1, "Slack alert for new leads", views=100),
+        _topic(2, "Gmail to Notion sync", views=10),
+    ]
+
+    assert forum_fetcher.ingest_forum_topics(db, topics, "US") == (2, False)
+
+    # The row is written, but its topic is left to be rescored
+    assert _forum_row(db, "Slack Workflow").views == 100
+    stored = get_forum_workflow_topics(db, "US", ["Slack Workflow", "Gmail → Notion Workflow"])
+    assert stored == {"Gmail → Notion Workflow": {2: (1, 0, 10, 1)}}
+
+    trends.failing = set()
+    assert forum_fetcher.ingest_forum_topics(db, topics, "US") == (1, True)
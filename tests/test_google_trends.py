@@ -0,0 +1,243 @@
+from types import SimpleNamespace
+
+import pytest
+
+from fetcher import google_trends
+from fetcher.google_trends import DEFAULT_TREND, TRENDS_ANCHOR, CircuitBreaker, TokenBucket
+
+
+class FakeTime:
+    """
+    Stand-in for the `time` module: sleep() advances monotonic().
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(google_trends, "time", fake)
+    return fake
+
+
+class Series(list):
+    def tolist(self):
+        return list(self)
+
+
+class Frame(dict):
+    @property
+    def empty(self):
+        return not self
+
+
+class Throttled(Exception):
+    # pytrends' TooManyRequestsError carries the 429 response
+    response = SimpleNamespace(status_code=429)
+
+
+class FakePytrends:
+    """
+    TrendReq stand-in: interest_over_time() raises `errors` in turn, then
+    returns a flat series for every term of the payload.
+    """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.payloads = []
+
+    def build_payload(self, terms, timeframe, geo):
+        self.payloads.append(terms)
+
+    def interest_over_time(self):
+        if self.errors:
+            raise self.errors.pop(0)
+        return Frame({term: Series([40, 40, 40, 40]) for term in self.payloads[-1]})
+
+
+class FakeCache:
+    def __init__(self, fresh=None, stale=None):
+        self.fresh = fresh or {}
+        self.stale = stale or {}
+        self.stored = {}
+
+    def get(self, keyword, country, timeframe):
+        return self.fresh.get(keyword)
+
+    def get_stale(self, keyword, country, timeframe):
+        return self.stale.get(keyword)
+
+    def set(self, keyword, country, timeframe, value):
+        self.stored[keyword] = value
+
+
+@pytest.fixture
+def trends(monkeypatch, clock):
+    """
+    get_trend_scores() wired to a fake client and cache, with a fresh
+    breaker (3 failures, 60 s cooldown) and no rate limit.
+    """
+    def install(client, cache=None):
+        cache = cache or FakeCache()
+        monkeypatch.setattr(google_trends, "get_pytrends", lambda: client)
+        monkeypatch.setattr(google_trends, "trends_cache", cache)
+        monkeypatch.setattr(google_trends, "_breaker", CircuitBreaker(failures=3, cooldown=60))
+        monkeypatch.setattr(google_trends, "_rate_limiter", TokenBucket(0, 1))
+        return cache
+    return install
+
+
+# -------------------------------------------------
+# TOKEN BUCKET
+# -------------------------------------------------
+
+def test_token_bucket_allows_a_burst_then_waits_for_refill(clock):
+    bucket = TokenBucket(rate_per_minute=60, capacity=3)
+
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.slept == []
+
+    bucket.acquire()
+    assert clock.slept == [pytest.approx(1.0)]
+
+
+def test_token_bucket_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+
+    # Idle for an hour: still only `capacity` calls without waiting
+    clock.now += 3600
+    for _ in range(2):
+        bucket.acquire()
+    assert clock.slept == []
+    bucket.acquire()
+    assert len(clock.slept) == 1
+
+
+def test_token_bucket_with_zero_rate_never_blocks(clock):
+    bucket = TokenBucket(rate_per_minute=0, capacity=1)
+    for _ in range(10):
+        bucket.acquire()
+    assert clock.slept == []
+
+# -------------------------------------------------
+# CIRCUIT BREAKER
+# -------------------------------------------------
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failures=3, cooldown=60)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_trips_at_once_on_throttling(clock):
+    breaker = CircuitBreaker(failures=3, cooldown=60)
+    breaker.record_failure(trip=True)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_lets_one_trial_call_through(clock):
+    breaker = CircuitBreaker(failures=1, cooldown=60)
+    breaker.record_failure()
+
+    clock.now += 59
+    assert not breaker.allow()
+
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # The trial call is still in flight
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_breaker_failed_trial_reopens_for_another_cooldown(clock):
+    breaker = CircuitBreaker(failures=3, cooldown=60)
+    breaker.record_failure(trip=True)
+
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock.now += 60
+    assert breaker.allow()
+
+# -------------------------------------------------
+# get_trend_scores FALLBACKS
+# -------------------------------------------------
+
+def test_throttled_payload_opens_breaker_and_skips_the_rest(trends):
+    client = FakePytrends(Throttled())
+    stale = {"slack": {**DEFAULT_TREND, "trend_score": 20, "trend_direction": "up"}}
+    trends(client, FakeCache(stale=stale))
+
+    keywords = ["slack", "gmail", "notion", "airtable", "jira", "discord"]
+    results = google_trends.get_trend_scores(keywords)
+
+    # Two payloads of up to 4 terms; the second is never sent
+    assert len(client.payloads) == 1
+    assert google_trends._breaker.state == "open"
+
+    # Last known value first, the default only without one
+    assert results["slack"]["trend_freshness"] == "stale"
+    assert results["slack"]["trend_direction"] == "up"
+    for keyword in keywords[1:]:
+        assert results[keyword] == {**DEFAULT_TREND, "trend_freshness": "default"}
+
+
+def test_generic_errors_open_breaker_after_threshold(trends, clock):
+    client = FakePytrends(RuntimeError("boom"), RuntimeError("boom"), RuntimeError("boom"))
+    trends(client)
+
+    for _ in range(3):
+        assert google_trends.get_trend_scores(["slack"])["slack"]["trend_freshness"] == "default"
+    assert google_trends._breaker.state == "open"
+
+    # Open: no request at all
+    google_trends.get_trend_scores(["slack"])
+    assert len(client.payloads) == 3
+
+    # After the cooldown the trial payload succeeds and closes it
+    clock.now += 60
+    result = google_trends.get_trend_scores(["slack"])["slack"]
+    assert result["trend_freshness"] == "fresh"
+    assert google_trends._breaker.state == "closed"
+
+
+def test_fresh_results_are_cached_and_anchored(trends):
+    client = FakePytrends()
+    cache = trends(client, FakeCache(fresh={"gmail": dict(DEFAULT_TREND, trend_score=10)}))
+
+    results = google_trends.get_trend_scores(["slack", "gmail"])
+
+    assert client.payloads == [["slack", TRENDS_ANCHOR]]
+    assert results["slack"]["trend_freshness"] == "fresh"
+    assert results["slack"]["avg_interest"] == google_trends.ANCHOR_INTEREST
+    assert cache.stored == {"slack": {k: v for k, v in results["slack"].items() if k != "trend_freshness"}}
+    assert results["gmail"]["trend_freshness"] == "fresh"
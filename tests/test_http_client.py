@@ -0,0 +1,212 @@
+import asyncio
+import os
+import time
+
+import httpx
+import pytest
+import requests
+
+from fetcher import http_client
+
+URL = "http://forum.test/latest.json"
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+    Delays requested by the retry loops, without sleeping.
+    """
+    delays = []
+
+    async def fake_async_sleep(seconds):
+        delays.append(seconds)
+
+    monkeypatch.setattr(http_client.time, "sleep", delays.append)
+    monkeypatch.setattr(http_client.asyncio, "sleep", fake_async_sleep)
+    return delays
+
+
+class FakeSession:
+    """
+    requests.Session stand-in answering with scripted (status, headers, body).
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        self.sent.append(headers or {})
+        status, response_headers, body = self.responses.pop(0)
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(response_headers)
+        response._content = body.encode()
+        response.url = url
+        return response
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def install(*responses):
+        fake = FakeSession(responses)
+        monkeypatch.setattr(http_client, "get_session", lambda host: fake)
+        return fake
+    return install
+
+
+def test_get_json_304_is_not_modified_only_once_ingested(session):
+    fake = session(
+        (200, {"ETag": '"v1"'}, '{"topics": [1]}'),
+        (304, {"ETag": '"v1"'}, ""),
+        (304, {"ETag": '"v1"'}, ""),
+    )
+
+    payload, not_modified, receipt = http_client.get_json(URL)
+    assert (payload, not_modified) == ({"topics": [1]}, False)
+    assert fake.sent[0] == {}
+
+    # Fetched but never committed: the cached body is served as new data
+    payload, not_modified, _ = http_client.get_json(URL)
+    assert (payload, not_modified) == ({"topics": [1]}, False)
+    assert fake.sent[1] == {"If-None-Match": '"v1"'}
+
+    http_client.mark_ingested([receipt])
+    payload, not_modified, _ = http_client.get_json(URL)
+    assert (payload, not_modified) == ({"topics": [1]}, True)
+
+
+def test_mark_ingested_ignores_superseded_receipts(session):
+    session(
+        (200, {"ETag": '"v1"'}, '{"topics": [1]}'),
+        (200, {"ETag": '"v2"'}, '{"topics": [2]}'),
+        (304, {"ETag": '"v2"'}, ""),
+    )
+
+    _, _, old_receipt = http_client.get_json(URL)
+    _, _, new_receipt = http_client.get_json(URL)
+
+    # The v1 write finishing late must not vouch for the v2 body
+    http_client.mark_ingested([old_receipt, None])
+    assert http_client.get_json(URL)[:2] == ({"topics": [2]}, False)
+
+    http_client.mark_ingested([new_receipt])
+    cached = http_client._read_cache(new_receipt["path"])
+    assert cached["ingested"] == {"etag": '"v2"', "last_modified": None}
+
+
+def test_get_json_without_validators_is_not_cached(session, cache_dir):
+    session((200, {}, '{"topics": []}'))
+    assert http_client.get_json(URL) == ({"topics": []}, False, None)
+    assert os.listdir(cache_dir) == []
+
+
+def test_get_retries_honoring_retry_after(session, sleeps):
+    fake = session(
+        (429, {"Retry-After": "3"}, ""),
+        (503, {"Retry-After": "3600"}, ""),
+        (502, {}, ""),
+        (200, {}, "{}"),
+    )
+
+    assert http_client.get(URL).status_code == 200
+    assert len(fake.sent) == 4
+    # Retry-After as given, capped at HTTP_BACKOFF_MAX, else jittered backoff
+    assert sleeps[:2] == [3.0, http_client.HTTP_BACKOFF_MAX]
+    assert 0 <= sleeps[2] <= http_client.HTTP_BACKOFF_BASE * 4
+
+
+def test_get_raises_once_retries_are_exhausted(session, sleeps, monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_MAX_RETRIES", 2)
+    fake = session(*[(503, {}, "")] * 3)
+
+    with pytest.raises(requests.HTTPError):
+        http_client.get(URL)
+    assert len(fake.sent) == 3
+    assert len(sleeps) == 2
+
+
+def test_retry_after_http_date():
+    response = requests.Response()
+    response.headers["Retry-After"] = time.strftime(
+        "%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 60)
+    )
+    assert 55 <= http_client._retry_after(response) <= 60
+
+    response.headers["Retry-After"] = "soon"
+    assert http_client._retry_after(response) is None
+
+
+def test_async_get_json_retries_and_revalidates(sleeps):
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "1"}),
+        httpx.Response(200, headers={"ETag": '"v1"'}, json={"topics": [1]}),
+        httpx.Response(304, headers={"ETag": '"v1"'}),
+    ]
+    sent = []
+
+    def handler(request):
+        sent.append(request.headers.get("If-None-Match"))
+        return responses.pop(0)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            _, _, receipt = await http_client.async_get_json(client, URL)
+            http_client.mark_ingested([receipt])
+            return await http_client.async_get_json(client, URL)
+
+    payload, not_modified, _ = asyncio.run(run())
+    assert (payload, not_modified) == ({"topics": [1]}, True)
+    assert sent == [None, None, '"v1"']
+    assert sleeps == [1.0]
+
+
+def test_prune_cache_keeps_recently_revalidated_entries(session, cache_dir):
+    session(
+        (200, {"ETag": '"a"'}, "{}"),
+        (200, {"ETag": '"b"'}, "{}"),
+        (304, {"ETag": '"a"'}, ""),
+    )
+    _, _, kept = http_client.get_json(URL, params={"page": 1})
+    _, _, pruned = http_client.get_json(URL, params={"page": 2})
+
+    old = time.time() - 30 * 86400
+    for receipt in (kept, pruned):
+        os.utime(receipt["path"], (old, old))
+    # A 304 counts as use
+    http_client.get_json(URL, params={"page": 1})
+
+    assert http_client.prune_cache(max_age_days=7) == 1
+    assert os.path.exists(kept["path"])
+    assert not os.path.exists(pruned["path"])
+
+
+def test_async_get_limits_requests_per_host(monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_POOL_SIZE", 2)
+    in_flight: dict = {}
+    peak: dict = {}
+
+    async def handler(request):
+        host = request.url.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        return httpx.Response(200, json={})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await asyncio.gather(*(
+                http_client.async_get(client, f"http://{host}/latest.json")
+                for host in ("a.test", "b.test")
+                for _ in range(6)
+            ))
+
+    asyncio.run(run())
+    assert peak == {"a.test": 2, "b.test": 2}
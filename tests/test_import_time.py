@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative `import app.main` time; fastapi + SQLAlchemy alone are ~0.4-0.9 s
+IMPORT_BUDGET_SECONDS = float(os.getenv("TEST_IMPORT_BUDGET_SECONDS", 2.0))
+
+# Ingestion dependencies the API must not load at startup
+INGESTION_MODULES = ("numpy", "pandas", "pytrends", "dotenv", "requests", "fetcher", "scripts")
+
+
+def _import_times(module: str, database_path: str) -> dict:
+    """
+    {module: cumulative seconds} from `python -X importtime -c "import <module>"`,
+    run without ingestion credentials against the SQLite file `database_path`.
+    """
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT, "DATABASE_URL": f"sqlite:///{database_path}"}
+    env.pop("YOUTUBE_API_KEY", None)
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=REPO_ROOT,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_app_main_imports_within_budget(tmp_path):
+    database_path = tmp_path / "untouched.db"
+    times = _import_times("app.main", database_path)
+
+    # No migrations, no connection: the database is not even created
+    assert not database_path.exists()
+
+    assert times["app.main"] < IMPORT_BUDGET_SECONDS, times["app.main"]
+
+    loaded = sorted(
+        name for name in times
+        if name.split(".")[0] in INGESTION_MODULES
+    )
+    assert loaded == []
+
+
+def test_api_imports_without_async_driver(tmp_path):
+    # PostgreSQL API reads need asyncpg, but only once a request opens a session
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO_ROOT,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'untouched.db'}",
+        "ASYNC_DATABASE_READ_URL": "postgresql+asyncpg://user@localhost/n8n",
+    }
+    code = (
+        "import sys; sys.modules['asyncpg'] = None\n"
+        "import app.database, app.main\n"
+        "try:\n"
+        "    app.database.async_read_session()\n"
+        "except ImportError:\n"
+        "    print('deferred')\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=REPO_ROOT,
+        check=True,
+    )
+    assert result.stdout.strip() == "deferred"
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import jobs
+from app.jobs import IngestionLocked, ingestion_lock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HOLD_LOCK = """
+import sys
+from app.jobs import ingestion_lock
+with ingestion_lock():
+    print("locked", flush=True)
+    sys.stdin.readline()
+"""
+
+
+def _holder():
+    process = subprocess.Popen(
+        [sys.executable, "-c", HOLD_LOCK],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+        env={**os.environ, "PYTHONPATH": REPO_ROOT},
+    )
+    assert process.stdout.readline().strip() == "locked"
+    return process
+
+
+def test_lock_is_exclusive_and_released():
+    with ingestion_lock():
+        with pytest.raises(IngestionLocked):
+            with ingestion_lock():
+                pass
+
+    with ingestion_lock():
+        pass
+    # Never deleted, so a second holder can't lose its lock to our cleanup
+    assert os.path.exists(jobs.INGEST_LOCK_PATH)
+
+
+def test_lock_held_by_another_process():
+    holder = _holder()
+    try:
+        with pytest.raises(IngestionLocked):
+            with ingestion_lock():
+                pass
+    finally:
+        holder.stdin.close()
+        holder.wait()
+
+    with ingestion_lock():
+        pass
+
+
+def test_lock_of_crashed_process_is_free():
+    holder = _holder()
+    holder.kill()
+    holder.wait()
+
+    with ingestion_lock():
+        pass
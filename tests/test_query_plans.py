@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import text
+
+from app.crud import _workflow_rows_stmt, bulk_upsert_workflows
+
+FILTER_SHAPES = [
+    (None, None),
+    ("YouTube", None),
+    (None, "US"),
+    ("YouTube", "US"),
+]
+
+
+@pytest.fixture
+def seeded(db):
+    bulk_upsert_workflows(db, [
+        {
+            "name": f"Workflow {i}",
+            "platform": ("YouTube", "Forum")[i % 2],
+            "country": ("US", "IN")[(i // 2) % 2],
+            "views": i * 10,
+            "popularity_score": i % 97,
+        }
+        for i in range(2_000)
+    ])
+    db.execute(text("ANALYZE"))
+    return db
+
+
+def _plan(db, stmt) -> list:
+    sql = stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize("platform,country", FILTER_SHAPES)
+@pytest.mark.parametrize("after", [None, (50, 1_000)], ids=["first_page", "cursor"])
+def test_workflows_page_is_served_in_index_order(seeded, platform, country, after):
+    plan = _plan(seeded, _workflow_rows_stmt(platform, country, 50, after))
+
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+    assert any("USING INDEX" in step for step in plan), plan
@@ -0,0 +1,118 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.crud import bulk_upsert_workflows
+from app.jobs import IngestionLocked, ingestion_lock
+from app.models import Workflow
+from app.scoring import calculate_pcs, generate_explanation
+from fetcher.google_trends import DEFAULT_TREND, _summarize_interest, _with_freshness
+from scripts.rescore import rescore_workflows
+
+TRENDS = {
+    # Real Trends data with no interest at all: stable, scored 10
+    "zero interest": _with_freshness(_summarize_interest("zero interest", [0] * 12), "fresh"),
+    "rising": _with_freshness(_summarize_interest("rising", [10] * 6 + [40] * 6), "fresh"),
+    "falling": _with_freshness(_summarize_interest("falling", [40] * 6 + [10] * 6), "stale"),
+    # Trends unavailable: the fallback
+    "fallback": _with_freshness(DEFAULT_TREND, "default"),
+}
+
+ROW_COLUMNS = [
+    "name",
+    "popularity_score",
+    "engagement_score",
+    "volume_score",
+    "trend_score",
+    "trend_direction",
+    "like_to_view_ratio",
+    "comment_to_view_ratio",
+    "explanation",
+]
+
+
+def _row(name: str, trend: dict, views: int, likes: int, comments: int) -> dict:
+    scores = calculate_pcs(views, likes, comments, keyword=name, country="US", trend_data=trend)
+    return {
+        "name": name,
+        "platform": "YouTube",
+        "country": "US",
+        "views": views,
+        "likes": likes,
+        "comments": comments,
+        "like_to_view_ratio": likes / views if views else 0,
+        "comment_to_view_ratio": comments / views if views else 0,
+        "popularity_score": scores["popularity_score"],
+        "engagement_score": scores["engagement_score"],
+        "volume_score": scores["volume_score"],
+        "trend_score": scores["trend_score"],
+        "trend_direction": trend["trend_direction"],
+        "trend_avg_interest": trend["avg_interest"],
+        "trend_freshness": trend["trend_freshness"],
+        "explanation": generate_explanation(views, likes, comments, trend["trend_direction"]),
+    }
+
+
+def _snapshot(db) -> list:
+    db.expire_all()
+    columns = [getattr(Workflow, name) for name in ROW_COLUMNS]
+    return db.query(*columns).order_by(Workflow.name).all()
+
+
+def test_rescore_without_formula_change_leaves_rows_unchanged(db):
+    rows = [
+        _row(f"{label} {views}", trend, views, views // 40, views // 300)
+        for label, trend in TRENDS.items()
+        for views in (0, 900, 60_000, 250_000)
+    ]
+    bulk_upsert_workflows(db, rows)
+    before = _snapshot(db)
+
+    assert rescore_workflows() == len(rows)
+    assert _snapshot(db) == before
+
+
+def test_rescore_keeps_zero_interest_trends_apart_from_the_fallback(db):
+    bulk_upsert_workflows(db, [
+        _row("zero interest", TRENDS["zero interest"], 900, 0, 0),
+        _row("fallback", TRENDS["fallback"], 900, 0, 0),
+    ])
+    rescore_workflows()
+
+    scores = dict(db.query(Workflow.name, Workflow.trend_score).all())
+    assert scores == {"zero interest": 10, "fallback": 5}
+
+
+def test_rescore_waits_for_no_ingestion(db):
+    with ingestion_lock():
+        with pytest.raises(IngestionLocked):
+            rescore_workflows()
+
+
+def _finished(client, job_id: str) -> dict:
+    for _ in range(200):
+        job = client.get(f"/rescore/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_rescore_endpoint_runs_as_a_job(db):
+    bulk_upsert_workflows(db, [_row("fallback", TRENDS["fallback"], 900, 0, 0)])
+
+    with TestClient(main.app) as client:
+        response = client.post("/rescore")
+        assert response.status_code == 202
+        job = _finished(client, response.json()["job_id"])
+        assert (job["kind"], job["status"], job["items"]) == ("rescore", "succeeded", 1)
+
+        # Rescore jobs are not ingestion jobs
+        assert client.get(f"/ingest/{job['id']}").status_code == 404
+
+        with ingestion_lock():
+            job = _finished(client, client.post("/rescore").json()["job_id"])
+        assert job["status"] == "failed"
+        assert "in progress" in job["error"]
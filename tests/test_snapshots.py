@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.crud import bulk_upsert_workflows, compact_snapshots
+from app.models import WorkflowSnapshot
+
+NOW = datetime(2026, 3, 20, 12, 0)
+DAY = datetime(2026, 3, 1)
+
+
+def _row(views: int) -> dict:
+    return {
+        "name": "Slack → Gmail Automation",
+        "platform": "YouTube",
+        "country": "US",
+        "views": views,
+        "likes": 0,
+        "comments": 0,
+        "popularity_score": 10,
+        "engagement_score": 0,
+        "volume_score": 10,
+        "trend_score": 0,
+        "trend_avg_interest": 0.0,
+    }
+
+
+def test_daily_rows_fall_inside_day_boundaries(db):
+    for hour, views in ((3, 100), (15, 300)):
+        bulk_upsert_workflows(db, [_row(views)], run_ts=DAY + timedelta(hours=hour))
+
+    assert compact_snapshots(db, now=NOW)["downsampled"] == 1
+
+    S = WorkflowSnapshot
+    in_range = (
+        db.query(S.run_ts, S.resolution, S.views)
+        .filter(S.run_ts >= DAY, S.run_ts < DAY + timedelta(days=1))
+        .all()
+    )
+    assert in_range == [(DAY, "daily", 300)]
+
+    # The day before ends before the daily row
+    assert db.query(S).filter(S.run_ts < DAY).count() == 0
+
+
+def test_history_serves_the_newest_points_and_pages_back(db):
+    # Every run stamps both countries with the same run_ts
+    for day in range(5):
+        bulk_upsert_workflows(
+            db,
+            [_row(day) | {"country": country} for country in ("US", "IN")],
+            run_ts=DAY + timedelta(days=day),
+        )
+
+    points = []
+    params = {"limit": 3}
+    with TestClient(main.app) as client:
+        while True:
+            response = client.get("/workflows/Slack → Gmail Automation/history", params=params)
+            assert response.status_code == 200
+            page = [(p["run_ts"], p["country"]) for p in response.json()]
+            # Each page is in time order and older than everything seen so far
+            assert page == sorted(page, key=lambda p: p[0])
+            points = page + points
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert len(points) == len(set(points)) == 10
+    assert points[-1][0] == (DAY + timedelta(days=4)).isoformat()
+
+
+def test_history_limit_keeps_the_newest_points(db):
+    for day in range(4):
+        bulk_upsert_workflows(db, [_row(day)], run_ts=DAY + timedelta(days=day))
+
+    with TestClient(main.app) as client:
+        response = client.get("/workflows/Slack → Gmail Automation/history", params={"limit": 2})
+
+    assert [p["views"] for p in response.json()] == [2, 3]
+    assert "X-Next-Cursor" in response.headers
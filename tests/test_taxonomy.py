@@ -0,0 +1,26 @@
+from fetcher.taxonomy import INTEGRATIONS, Taxonomy, classify
+
+
+def test_title_order_does_not_split_workflows():
+    names = classify([
+        "Slack to Gmail automation with n8n",
+        "n8n: Gmail → Slack alerts",
+        "Send Gmail emails from SLACK",
+    ])
+    assert names == ["Gmail → Slack Automation"] * 3
+
+
+def test_labels_beyond_the_limit_are_dropped_in_vocabulary_order():
+    assert classify(["AI agent posts Notion pages to Slack"]) == ["Slack → Notion Automation"]
+
+
+def test_everyday_words_do_not_match():
+    assert classify(["Zoom in on my Excel skills"]) == ["General n8n Automation"]
+    assert classify(["Export MS Excel rows to Airtable"]) == ["Airtable → Microsoft Excel Automation"]
+
+
+def test_custom_vocabulary_keeps_its_order():
+    taxonomy = Taxonomy({"Zeta": ("z",), "Alpha": ()})
+    assert taxonomy.workflow_name("alpha meets z") == "Zeta → Alpha Automation"
+    assert taxonomy.workflow_name("nothing here") == "General n8n Automation"
+    assert "Zoom" not in INTEGRATIONS
@@ -0,0 +1,96 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import main
+from app.crud import bulk_upsert_workflows
+from app.models import Workflow
+from app.schemas import WorkflowOut
+
+ROWS = [
+    # Tiny and awkward floats
+    {"name": "Gmail → Slack Automation", "views": 10**12, "likes": 1,
+     "like_to_view_ratio": 1e-12, "comment_to_view_ratio": 5e-324,
+     "trend_avg_interest": 0.1 + 0.2, "popularity_score": 90},
+    {"name": "Denormal", "like_to_view_ratio": 2.2250738585072014e-308,
+     "comment_to_view_ratio": 1 / 3, "trend_avg_interest": 1e-7, "popularity_score": 80},
+    # NULLs everywhere WorkflowOut allows them
+    {"name": "Nulls", "views": None, "likes": None, "comments": None,
+     "like_to_view_ratio": None, "comment_to_view_ratio": None,
+     "trend_direction": None, "trend_avg_interest": None, "trend_freshness": None,
+     "popularity_score": 70},
+    # Non-ASCII, escapes and control characters
+    {"name": "Café ✓ → 日本語 🚀 Workflow", "explanation": 'Quote " backslash \\ tab \t nul \x00 ʼ',
+     "popularity_score": 70},
+    {"name": "Zoho CRM → Ελληνικά Automation", "country": "IN", "explanation": "  ",
+     "popularity_score": 0},
+]
+
+
+def _row(values: dict) -> dict:
+    return {
+        "platform": "YouTube",
+        "country": "US",
+        "views": 1_000,
+        "likes": 10,
+        "comments": 1,
+        "like_to_view_ratio": 0.01,
+        "comment_to_view_ratio": 0.001,
+        "engagement_score": 11,
+        "volume_score": 10,
+        "trend_score": 10,
+        "trend_direction": "stable",
+        "trend_avg_interest": 12.5,
+        "trend_freshness": "fresh",
+        "explanation": "Moderate popularity based on engagement, reach, and trend signals.",
+        **values,
+    }
+
+
+@pytest.fixture
+def client(db):
+    bulk_upsert_workflows(db, [_row(values) for values in ROWS])
+    main._leaderboard_cache.clear()
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def reference(db):
+    """
+    The response_model path /workflows is compared against: ORM rows
+    returned through response_model=list[WorkflowOut].
+    """
+    app = FastAPI()
+
+    @app.get("/workflows", response_model=list[WorkflowOut])
+    def list_workflows():
+        return (
+            db.query(Workflow)
+            .order_by(Workflow.popularity_score.desc(), Workflow.id.desc())
+            .all()
+        )
+
+    return TestClient(app)
+
+
+def test_body_is_byte_identical_to_response_model(client, reference):
+    expected = reference.get("/workflows")
+    response = client.get("/workflows", params={"limit": 500})
+
+    assert response.status_code == 200
+    assert len(response.json()) == len(ROWS)
+    assert response.content == expected.content
+
+
+def test_pages_concatenate_to_the_same_rows(client, reference):
+    rows = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/workflows", params=params)
+        rows += response.json()
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert rows == reference.get("/workflows").json()
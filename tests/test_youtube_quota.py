@@ -0,0 +1,135 @@
+import pytest
+import requests
+
+from fetcher import youtube_fetcher
+from fetcher.youtube_quota import QuotaAccountant
+
+QUERIES = ["n8n slack automation", "n8n gmail automation", "n8n notion workflow"]
+
+
+def _http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def _page(query, country, page_size, token):
+    items = [
+        {"id": {"videoId": f"{query}-{country}-{token}-{i}"}, "snippet": {"title": query}}
+        for i in range(page_size)
+    ]
+    return items, False, None if token else "page-2", None
+
+
+def _stats(video_ids):
+    return [{"id": video_id} for video_id in video_ids], False, None
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """
+    Fake search / videos endpoints; `api.sent` lists every call made.
+    """
+    class Api:
+        sent = []
+        fail_on = None
+
+        @classmethod
+        def search(cls, query, country, page_size, token=None):
+            cls.sent.append(("search", query, token))
+            if cls.fail_on is not None and len(cls.sent) == cls.fail_on:
+                raise cls.error
+            return _page(query, country, page_size, token)
+
+        @classmethod
+        def stats(cls, video_ids):
+            cls.sent.append(("videos", len(video_ids)))
+            return _stats(video_ids)
+
+    monkeypatch.setattr(youtube_fetcher, "SEARCH_QUERIES", QUERIES)
+    monkeypatch.setattr(youtube_fetcher, "search_videos", Api.search)
+    monkeypatch.setattr(youtube_fetcher, "get_video_stats", Api.stats)
+    Api.sent = []
+    return Api
+
+# -------------------------------------------------
+# ACCOUNTANT
+# -------------------------------------------------
+
+def test_try_charge_reserves_follow_up_calls():
+    quota = QuotaAccountant(run_quota=202, daily_quota=10_000)
+
+    assert quota.try_charge("search", reserve=("videos",))
+    assert (quota.spent, quota.reserved, quota.remaining) == (100, 1, 101)
+    # 100 + 1 reserved would leave nothing for the first page's stats
+    assert quota.try_charge("search", reserve=("videos",))
+    assert not quota.try_charge("search", reserve=("videos",))
+    assert quota.stats()["skipped_pages"] == 1
+
+    # Reserved units pay for the stats calls
+    quota.charge("videos")
+    quota.charge("videos")
+    assert (quota.spent, quota.reserved, quota.remaining) == (202, 0, 0)
+
+
+def test_release_gives_back_the_charge_and_reservation():
+    quota = QuotaAccountant(run_quota=1_000, daily_quota=10_000)
+
+    assert quota.try_charge("search", reserve=("videos",))
+    quota.release("search", reserve=("videos",))
+
+    assert (quota.spent, quota.reserved, quota.calls["search"]) == (0, 0, 0)
+
+
+def test_budget_is_capped_by_what_is_left_today():
+    quota = QuotaAccountant(used_today=9_950, run_quota=5_000, daily_quota=10_000)
+    assert quota.budget == 50
+    assert not quota.try_charge("search")
+
+# -------------------------------------------------
+# FETCH
+# -------------------------------------------------
+
+def test_fetch_charges_every_sent_call(api):
+    quota = QuotaAccountant(run_quota=10_000, daily_quota=10_000)
+    youtube_fetcher.fetch_videos(["US"], 100, quota)
+
+    searches = sum(1 for call in api.sent if call[0] == "search")
+    batches = sum(1 for call in api.sent if call[0] == "videos")
+    assert (searches, batches) == (6, 6)
+    assert quota.spent == searches * 100 + batches
+    assert quota.calls == {"search": searches, "videos": batches}
+    assert quota.reserved == 0
+
+
+@pytest.mark.parametrize("error,charged_searches", [
+    # The API answered: that call is charged, the ones never sent are not
+    (_http_error(403), 2),
+    # Never reached the API: nothing past the first page is charged
+    (requests.ConnectionError("refused"), 1),
+])
+def test_failed_fetch_keeps_only_calls_the_api_received(api, error, charged_searches):
+    api.fail_on, api.error = 2, error
+    quota = QuotaAccountant(run_quota=10_000, daily_quota=10_000)
+
+    with pytest.raises(type(error)):
+        youtube_fetcher.fetch_videos(["US"], 100, quota)
+
+    assert len(api.sent) == 2
+    assert quota.calls == {"search": charged_searches, "videos": 0}
+    assert quota.spent == charged_searches * 100
+    assert quota.reserved == charged_searches
+
+
+def test_missing_api_key_charges_nothing(monkeypatch):
+    def get_api_key():
+        raise RuntimeError("YOUTUBE_API_KEY not found in environment")
+
+    monkeypatch.setattr(youtube_fetcher, "SEARCH_QUERIES", QUERIES)
+    monkeypatch.setattr(youtube_fetcher, "get_api_key", get_api_key)
+    quota = QuotaAccountant(run_quota=10_000, daily_quota=10_000)
+
+    with pytest.raises(RuntimeError):
+        youtube_fetcher.fetch_videos(["US"], 100, quota)
+
+    assert (quota.spent, quota.reserved) == (0, 0)